@@ -1,9 +1,25 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment, Follow
 
 
-class PostAdmin(admin.ModelAdmin):
+class IndexedSearchMixin:
+    """Поиск в админке через полнотекстовый индекс вместо LIKE '%...%'."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_supported():
+            return super().get_search_results(
+                request, queryset, search_term)
+        if not search.build_query(search_term):
+            return queryset.none(), False
+        return queryset.filter(pk__in=search.matching_ids(
+            search_term, self.search_kind)), False
+
+
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = search.POST
     list_display = ('pk', 'text', 'pub_date', 'author')
     list_display_links = ('pk', 'text', 'author')
     search_fields = ('text',)
@@ -19,7 +35,8 @@ class GroupAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = search.COMMENT
     list_display = ('pk', 'post', 'author', 'text', 'created')
     list_display_links = ('pk', 'post', 'author', 'text')
     search_fields = ('text',)
@@ -0,0 +1,208 @@
+"""
+JSON API только для чтения: те же ленты, что и в HTML, без шаблонов.
+
+Строки берутся из .values() и не превращаются в объекты моделей.
+Параметр fields=id,text оставляет в ответе только перечисленные поля,
+списки листаются курсором: ссылка на следующую страницу - в "next".
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_safe
+
+from yatube.routers import read_from_replica
+
+from .cache import (author_version, follow_version, group_version,
+                    index_version, page_etag)
+from .middleware import query_budget
+from .models import Comment, Group, Post, User
+from .paginator import CURSOR_PARAM, CursorPaginator
+
+# публичное имя поля -> путь для .values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+AUTHOR_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'counters__posts_count',
+    'followers_count': 'counters__followers_count',
+    'following_count': 'counters__following_count',
+}
+MAX_AGE = 60
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def api_view(etag_func, budget):
+    """Общая обвязка: GET/HEAD, бюджет запросов, реплика, ETag, ошибки."""
+    def decorator(view_func):
+        @read_from_replica
+        @query_budget(budget)
+        @require_safe
+        @condition(etag_func=etag_func)
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            try:
+                response = view_func(request, *args, **kwargs)
+            except BadRequest as exc:
+                return error(400, str(exc))
+            if response.status_code == 200:
+                # ответ зависит от пользователя сессии (ETag, лента)
+                private = SESSION_KEY in request.session
+                patch_cache_control(response, max_age=MAX_AGE,
+                                    public=not private, private=private)
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def selected_fields(request, available):
+    names = request.GET.get('fields')
+    if not names:
+        return list(available)
+    names = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = set(names) - set(available)
+    if unknown:
+        raise BadRequest('Неизвестные поля: %s; доступны: %s' % (
+            ', '.join(sorted(unknown)), ', '.join(available)))
+    return names
+
+
+def serialize(row, fields, available):
+    item = {name: row[available[name]] for name in fields}
+    if item.get('image') is not None:
+        item['image'] = (Post.image.field.storage.url(item['image'])
+                         if item['image'] else None)
+    return item
+
+
+def cursor_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[CURSOR_PARAM] = cursor
+    return request.build_absolute_uri(
+        request.path + '?' + urlencode(sorted(query.items())))
+
+
+def page_of(request, rows, fields, available=POST_FIELDS,
+            ordering=('-pub_date', '-id')):
+    """Страница курсорной выдачи из .values() с нужными полями."""
+    keys = [field.lstrip('-') for field in ordering]
+    rows = rows.values(*{available[name] for name in fields} | set(keys))
+    paginator = CursorPaginator(rows, settings.TEN_POSTS, ordering)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return {
+        'results': [serialize(row, fields, available) for row in page],
+        'next': cursor_url(request, page.next_cursor),
+        'previous': cursor_url(request, page.previous_cursor),
+    }
+
+
+def index_etag(request):
+    return page_etag(request, index_version())
+
+
+def group_etag(request, slug):
+    return page_etag(request, group_version(slug))
+
+
+def author_etag(request, username, post_id=None):
+    return page_etag(request, author_version(username))
+
+
+def follow_etag(request):
+    return page_etag(request, follow_version(
+        request.session.get(SESSION_KEY)))
+
+
+def respond(data):
+    return JsonResponse(data, encoder=DjangoJSONEncoder,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@api_view(index_etag, 2)
+def posts(request):
+    fields = selected_fields(request, POST_FIELDS)
+    return respond(page_of(request, Post.objects.all(), fields))
+
+
+@api_view(group_etag, 3)
+def group_posts(request, slug):
+    fields = selected_fields(request, POST_FIELDS)
+    group = Group.objects.filter(slug=slug).values(
+        'id', 'title', 'slug', 'description').first()
+    if group is None:
+        return error(404, 'Сообщество не найдено')
+    data = page_of(request, Post.objects.filter(group_id=group.pop('id')),
+                   fields)
+    return respond({'group': group, **data})
+
+
+@api_view(author_etag, 3)
+def profile(request, username):
+    fields = selected_fields(request, POST_FIELDS)
+    author = User.objects.filter(username=username).values(
+        'id', *AUTHOR_FIELDS.values()).first()
+    if author is None:
+        return error(404, 'Автор не найден')
+    data = page_of(request, Post.objects.filter(author_id=author['id']),
+                   fields)
+    author = {name: author[path] for name, path in AUTHOR_FIELDS.items()}
+    for name in ('posts_count', 'followers_count', 'following_count'):
+        # строки счётчиков может ещё не быть
+        author[name] = author[name] or 0
+    return respond({'author': author, **data})
+
+
+@api_view(author_etag, 4)
+def post(request, username, post_id):
+    fields = selected_fields(request, POST_FIELDS)
+    row = Post.objects.filter(author__username=username, id=post_id).values(
+        *{POST_FIELDS[name] for name in fields}).first()
+    if row is None:
+        return error(404, 'Пост не найден')
+    # fields= относится к посту, у комментариев поля всегда полные
+    comments = page_of(request, Comment.objects.filter(post_id=post_id),
+                       list(COMMENT_FIELDS), COMMENT_FIELDS,
+                       ordering=('-created', '-id'))
+    return respond({**serialize(row, fields, POST_FIELDS),
+                    'comments': comments})
+
+
+@api_view(follow_etag, 5)
+def follow(request):
+    fields = selected_fields(request, POST_FIELDS)
+    if not request.user.is_authenticated:
+        return error(401, 'Нужно войти')
+    rows = Post.objects.filter(feed__user=request.user).annotate(
+        feed_pub_date=F('feed__pub_date'))
+    return respond(page_of(request, rows, fields,
+                           ordering=('-feed_pub_date', '-id')))
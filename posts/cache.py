@@ -0,0 +1,155 @@
+"""
+Поколения (версии) кэша для лент постов.
+
+Каждая область видимости хранит в кэше случайный токен поколения.
+Ключи фрагментов и страниц включают токены своих областей, поэтому
+смена токена мгновенно делает устаревшими все зависящие записи,
+а сами записи можно кэшировать надолго.
+
+Области: 'index', 'groups' (названия сообществ на карточках),
+'group:<slug>', 'author:<username>', 'posts:<author_id>' (посты автора
+в лентах подписчиков), 'follow:<user_id>' (список подписок) и 'replica'
+(меняется после каждой синхронизации реплики). Версия ленты подписок
+складывается из 'posts:' всех авторов, на которых подписан читатель:
+изменение поста пишет один ключ, а не ключ на каждого подписчика.
+
+Токены должны лежать в кэше, общем для всех воркеров (SQLiteCache,
+memcached). В кэше процесса (LocMemCache) сброс в одном воркере другие
+не видят, поэтому там токены живут CACHE_VERSION_TIMEOUT секунд - это
+предел устаревания страниц в соседних процессах.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core import checks
+from django.core.cache import cache
+
+from yatube.routers import read_alias
+
+from .models import Follow, Group, Post
+
+FRAGMENT_TIMEOUT = 60 * 60
+# кэши, которые видит только свой процесс
+PROCESS_LOCAL = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _key(scope):
+    return f'version:{scope}'
+
+
+def _token():
+    return uuid.uuid4().hex[:12]
+
+
+def version_timeout():
+    return getattr(settings, 'CACHE_VERSION_TIMEOUT', None)
+
+
+def get_versions(*scopes):
+    """Возвращает общую версию для набора областей одним запросом к кэшу."""
+    if read_alias() is not None:
+        # реплика отстаёт от основной базы: фрагменты, собранные по ней,
+        # не должны пережить следующую синхронизацию
+        scopes += ('replica',)
+    keys = [_key(scope) for scope in scopes]
+    tokens = cache.get_many(keys)
+    missing = {key: _token() for key in keys if key not in tokens}
+    if missing:
+        for key, token in missing.items():
+            # другой процесс мог успеть создать токен раньше нас
+            if not cache.add(key, token, version_timeout()):
+                token = cache.get(key, token)
+            tokens[key] = token
+    return '.'.join(tokens[key] for key in keys)
+
+
+def bump(*scopes):
+    cache.set_many({_key(scope): _token() for scope in scopes},
+                   version_timeout())
+
+
+def index_version():
+    return get_versions('index', 'groups')
+
+
+def group_version(slug):
+    return get_versions(f'group:{slug}', 'groups')
+
+
+def author_version(username):
+    return get_versions(f'author:{username}', 'groups')
+
+
+def follow_version(user_id):
+    return get_versions(f'follow:{user_id}', 'groups', *[
+        f'posts:{author_id}' for author_id in following(user_id)])
+
+
+def following(user_id):
+    """id авторов, на которых подписан пользователь; кэшируется до смены
+    подписок."""
+    key = f'following:{user_id}:{get_versions(f"follow:{user_id}")}'
+    authors = cache.get(key)
+    if authors is None:
+        authors = list(Follow.objects.filter(user_id=user_id).values_list(
+            'author_id', flat=True))
+        cache.set(key, authors, FRAGMENT_TIMEOUT)
+    return authors
+
+
+def page_etag(request, version):
+    """
+    ETag страницы: версия её данных и пользователь, для которого она
+    собрана. id пользователя берётся из сессии, без запроса к auth_user.
+    """
+    return f'{version}.{request.session.get(SESSION_KEY, "")}'
+
+
+def post_scopes(post, old_group_id=None):
+    """Области, в которых показывается пост (и его счётчик комментариев)."""
+    scopes = ['index', f'author:{post.author.username}',
+              f'posts:{post.author_id}']
+    group_ids = {post.group_id, old_group_id} - {None}
+    if group_ids:
+        scopes += [f'group:{slug}' for slug in Group.objects.filter(
+            id__in=group_ids).values_list('slug', flat=True)]
+    return scopes
+
+
+def comment_scopes(post_id):
+    """Области поста, у которого изменились комментарии, одним запросом."""
+    return _listed_scopes(Post.objects.filter(pk=post_id))
+
+
+def image_scopes(sources):
+    """Области постов с этими картинками - после готовности миниатюр."""
+    return _listed_scopes(Post.objects.filter(image__in=sources))
+
+
+def _listed_scopes(posts):
+    scopes = set()
+    for author_id, username, slug in posts.values_list(
+            'author_id', 'author__username', 'group__slug'):
+        scopes.update(('index', f'author:{username}', f'posts:{author_id}'))
+        if slug:
+            scopes.add(f'group:{slug}')
+    return sorted(scopes)
+
+
+@checks.register(checks.Tags.caches)
+def check_version_cache(app_configs, **kwargs):
+    """Бессрочные токены в кэше процесса не сбрасываются у соседей."""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_LOCAL and version_timeout() is None:
+        return [checks.Warning(
+            'Токены поколений кэша бессрочны, а кэш по умолчанию '
+            'у каждого процесса свой.',
+            hint='Задайте YATUBE_CACHE_PATH (общий SQLiteCache) или '
+                 'ограничьте CACHE_VERSION_TIMEOUT.',
+            id='posts.W001',
+        )]
+    return []
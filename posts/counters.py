@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorCounters, Blob, Comment, Follow, Post, User
+
+
+def _count(queryset, field):
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+        field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+@transaction.atomic
+def recount_all():
+    """Пересчитывает все денормализованные счётчики одним проходом."""
+    Post.objects.update(comment_count=_count(Comment.objects, 'post'))
+    AuthorCounters.objects.bulk_create(
+        [AuthorCounters(user_id=pk)
+         for pk in User.objects.values_list('pk', flat=True).iterator()],
+        batch_size=500, ignore_conflicts=True)
+    AuthorCounters.objects.update(
+        posts_count=_count(Post.objects, 'author'),
+        followers_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+    )
+    images = Post.objects.exclude(image='').exclude(image__isnull=True)
+    Blob.objects.bulk_create(
+        [Blob(name=name) for name in images.values_list(
+            'image', flat=True).order_by().distinct().iterator()],
+        batch_size=500, ignore_conflicts=True)
+    Blob.objects.update(refcount=_count(Post.objects, 'image'))
@@ -0,0 +1,66 @@
+from django.db import connection
+
+from .models import FeedEntry, Follow, Post
+
+BATCH_SIZE = 500
+
+
+def fan_out(post):
+    """Размножает новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    entries = (
+        FeedEntry(user_id=user_id, author_id=post.author_id,
+                  post_id=post.id, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+    _bulk_create(entries)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('id', 'pub_date')
+    entries = (
+        FeedEntry(user_id=user_id, author_id=author_id,
+                  post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+    _bulk_create(entries)
+
+
+def cleanup(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """
+    Заполняет ленты всех подписчиков по таблицам подписок и постов.
+
+    Записей здесь порядка (подписки x посты автора), поэтому они
+    вставляются одним INSERT ... SELECT, без объектов в Python.
+    """
+    posts = Post.objects.filter(author__following__isnull=False).values_list(
+        'author__following__user_id', 'author_id', 'id', 'pub_date'
+    ).order_by()
+    select, params = posts.query.sql_with_params()
+    columns = ', '.join(FeedEntry._meta.get_field(name).column
+                        for name in ('user', 'author', 'post', 'pub_date'))
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{FeedEntry._meta.db_table} ({columns}) {select} '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            params)
+
+
+def _bulk_create(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
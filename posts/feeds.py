@@ -0,0 +1,140 @@
+"""
+RSS и Atom ленты сайта, сообществ и авторов.
+
+Готовый XML хранится в кэше под версией области (см. posts.cache) и
+живёт, пока в области не изменится пост. Версия же служит ETag:
+повторный опрос читателем с If-None-Match стоит одного обращения к кэшу
+и ни одного запроса к базе.
+"""
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import patch_cache_control
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from yatube.routers import read_from_replica
+
+from .cache import (FRAGMENT_TIMEOUT, author_version, group_version,
+                    index_version)
+from .models import Group, Post, User
+
+FEED_SIZE = 20
+MAX_AGE = 5 * 60
+
+
+class PostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    link = reverse_lazy('index')
+    description = 'Новые записи всех авторов'
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj=None):
+        # ограниченная выборка по индексу (-pub_date, -id) и его вариантам
+        # для автора и сообщества
+        return self.posts(obj).select_related('author', 'group').order_by(
+            '-pub_date', '-id')[:FEED_SIZE]
+
+    def item_title(self, item):
+        return item.text[:60]
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('post', args=[item.author.username, item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupPostsFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def link(self, obj):
+        return reverse('group_posts', args=[obj.slug])
+
+    def description(self, obj):
+        return obj.description or f'Записи сообщества {obj.title}'
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class AuthorPostsFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def link(self, obj):
+        return reverse('profile', args=[obj.username])
+
+    def description(self, obj):
+        return f'Записи автора {obj.username}'
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class PostsAtomFeed(PostsFeed):
+    feed_type = Atom1Feed
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+
+def cached_feed(feed, version_func):
+    """
+    View ленты: XML из кэша по версии области и ответ 304 по ETag.
+
+    Лента не зависит от пользователя, поэтому сессия не читается.
+    """
+    def etag(request, **kwargs):
+        return version_func(**kwargs)
+
+    @read_from_replica
+    @condition(etag_func=etag)
+    def view(request, **kwargs):
+        # абсолютные ссылки в XML зависят от хоста запроса
+        url = request.build_absolute_uri(request.path)
+        key = f'feed:{etag(request, **kwargs)}:{url}'
+        cached = cache.get(key)
+        if cached is None:
+            response = feed(request, **kwargs)
+            cache.set(key, (response.content, response['Content-Type']),
+                      FRAGMENT_TIMEOUT)
+        else:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        patch_cache_control(response, public=True, max_age=MAX_AGE)
+        return response
+    return view
+
+
+site_rss = cached_feed(PostsFeed(), index_version)
+site_atom = cached_feed(PostsAtomFeed(), index_version)
+group_rss = cached_feed(GroupPostsFeed(), group_version)
+group_atom = cached_feed(GroupPostsAtomFeed(), group_version)
+author_rss = cached_feed(AuthorPostsFeed(), author_version)
+author_atom = cached_feed(AuthorPostsAtomFeed(), author_version)
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.models import Post, Thumbnail
+
+# ширина области просмотра в CSS-пикселях и плотность экрана
+VIEWPORTS = (
+    ('телефон', 360, 3),
+    ('планшет', 768, 2),
+    ('ноутбук', 1366, 1),
+)
+
+
+class Command(BaseCommand):
+    help = ('Считает байты картинок первой страницы ленты: оригиналы, '
+            'старая миниатюра 960x339 и варианты из srcset')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=settings.TEN_POSTS,
+                            help='Сколько последних постов учитывать')
+
+    def handle(self, *args, **options):
+        sources = [
+            name for name in Post.objects.exclude(image='').exclude(
+                image__isnull=True).values_list('image', flat=True)[
+                    :options['posts']]
+        ]
+        variants = {}
+        for thumbnail in Thumbnail.objects.filter(source__in=sources):
+            variants.setdefault(thumbnail.source, []).append(thumbnail)
+        sources = [source for source in sources if source in variants]
+        if not sources:
+            self.stdout.write('Нет постов с готовыми миниатюрами: '
+                              'запустите manage.py thumbnails')
+            return
+
+        originals = sum(default_storage.size(name) for name in sources)
+        legacy = sum(self.pick(variants[name], 960, 'jpeg').size
+                     for name in sources)
+        self.stdout.write(f'Постов с картинками: {len(sources)}')
+        self.stdout.write(f'Оригиналы: {originals} байт')
+        self.stdout.write(f'Миниатюры 960x339 JPEG: {legacy} байт')
+        for title, width, density in VIEWPORTS:
+            needed = min(width, 960) * density
+            for image_format in ('jpeg', 'webp'):
+                total = sum(self.pick(variants[name], needed,
+                                      image_format).size
+                            for name in sources)
+                saved = 100 * (1 - total / legacy) if legacy else 0
+                self.stdout.write(
+                    f'{title} ({width}px x{density}), {image_format}: '
+                    f'{total} байт, экономия {saved:.0f}%')
+
+    @staticmethod
+    def pick(thumbnails, width, image_format):
+        """Вариант, который браузер выберет из srcset для нужной ширины."""
+        candidates = sorted(
+            (item for item in thumbnails if item.format == image_format),
+            key=lambda item: item.width)
+        if not candidates:
+            candidates = sorted((item for item in thumbnails
+                                 if item.format == 'jpeg'),
+                                key=lambda item: item.width)
+        for item in candidates:
+            if item.width >= width:
+                return item
+        return candidates[-1]
@@ -0,0 +1,138 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.seeding import Seeder
+
+PREFIX = 'bench'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими данными внутри откатываемой '
+            'транзакции и сравнивает планы и время запросов страниц '
+            'с составными индексами и без них')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Сколько раз выполнять каждый запрос')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Сравнение планов написано для SQLite')
+        self.repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                targets = self.seed(options)
+                self.stdout.write('Данные созданы за %.1f с' % (
+                    time.perf_counter() - started))
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                after = self.measure(targets, 'after')
+                self.drop_indexes()
+                before = self.measure(targets, 'before')
+                self.report(before, after)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        # тот же генератор, что у seed_data: данные зависят только от --seed
+        try:
+            Seeder(options['seed'], PREFIX).run(
+                users=options['authors'], groups=options['groups'],
+                posts=options['posts'], comments=options['comments'],
+                follows=options['follows'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        post_ids = list(Post.objects.filter(
+            author__username__startswith=PREFIX).order_by('id').values_list(
+                'id', flat=True))
+        if not post_ids:
+            raise CommandError('Нужен хотя бы один пост: --posts')
+        return {
+            # первые по закону Ципфа - самые популярные
+            'author': User.objects.filter(
+                username__startswith=PREFIX).order_by('id').first(),
+            'group': Group.objects.filter(
+                slug__startswith=f'{PREFIX}-').order_by('id').first(),
+            # у самых популярных постов тысячи комментариев: берём
+            # типичный пост из середины распределения
+            'post': Post.objects.get(pk=post_ids[len(post_ids) // 100]),
+        }
+
+    def queries(self, targets):
+        ordering = ('-pub_date', '-id')
+        middle = Post.objects.order_by(*ordering).values_list(
+            'pub_date', 'id')[Post.objects.count() // 2]
+        return [
+            ('index', Post.objects.select_related(
+                'author', 'group').order_by(*ordering)[:11]),
+            ('index, середина ленты', Post.objects.select_related(
+                'author', 'group').filter(pub_date__lt=middle[0]).order_by(
+                    *ordering)[:11]),
+            ('group_posts', targets['group'].posts.select_related(
+                'author').order_by(*ordering)[:11]),
+            ('profile', targets['author'].posts.select_related(
+                'group').order_by(*ordering)[:11]),
+            ('post_view: комментарии', targets['post'].comments.
+                select_related('author')),
+            ('подписчики автора', Follow.objects.filter(
+                author=targets['author']).values_list('user_id', flat=True)),
+        ]
+
+    def measure(self, targets, label):
+        results = {}
+        for name, queryset in self.queries(targets):
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - started)
+            results[name] = (self.explain(queryset, label),
+                             statistics.median(timings) * 1000)
+        return results
+
+    @staticmethod
+    def explain(queryset, label):
+        sql, params = queryset.query.sql_with_params()
+        # модуль sqlite3 кэширует подготовленные запросы, а EXPLAIN после
+        # DROP INDEX не перепланируется: метка делает текст запроса новым
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql} /* {label} */', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    @staticmethod
+    def drop_indexes():
+        with connection.cursor() as cursor:
+            for model in (Post, Comment, Follow):
+                for index in model._meta.indexes:
+                    cursor.execute(
+                        'DROP INDEX %s' % connection.ops.quote_name(
+                            index.name))
+
+    def report(self, before, after):
+        for name in after:
+            plan_before, time_before = before[name]
+            plan_after, time_after = after[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write('  без индексов: %.2f мс' % time_before)
+            for line in plan_before:
+                self.stdout.write('    ' + line)
+            self.stdout.write('  с индексами:  %.2f мс (x%.1f)' % (
+                time_after, time_before / time_after if time_after else 0))
+            for line in plan_after:
+                self.stdout.write('    ' + line)
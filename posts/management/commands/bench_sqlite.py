@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from posts.models import Comment, Post, User
+from yatube.sqlite.base import backup
+
+# голый sqlite3 без настроек: так работал DATABASES до yatube.sqlite
+BASELINE = {
+    'options': {
+        'transaction_mode': 'DEFERRED',
+        'pragmas': {
+            'journal_mode': 'DELETE',
+            'synchronous': 'FULL',
+            'busy_timeout': 5000,
+            'cache_size': -2000,
+            'mmap_size': 0,
+            'temp_store': 'DEFAULT',
+        },
+    },
+    'persistent': False,
+}
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_worker(path, profile, duration, write_ratio, seed, queue):
+    """Тело дочернего процесса: смесь чтений ленты и записи комментариев."""
+    connection.settings_dict['NAME'] = path
+    connection.settings_dict['OPTIONS'] = profile['options']
+    rng = random.Random(seed)
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    author_id = User.objects.values_list('id', flat=True).first()
+    result = {'read': [], 'write': [], 'errors': 0}
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        kind = 'write' if rng.random() < write_ratio else 'read'
+        started = time.perf_counter()
+        try:
+            if kind == 'write':
+                Comment.objects.create(post_id=rng.choice(post_ids),
+                                       author_id=author_id, text='Нагрузка')
+            else:
+                list(Post.objects.select_related('author', 'group')[
+                    :settings.TEN_POSTS])
+        except OperationalError:
+            result['errors'] += 1
+        else:
+            result[kind].append(time.perf_counter() - started)
+        if not profile['persistent']:
+            # CONN_MAX_AGE = 0: новое соединение на каждый запрос
+            connection.close()
+    connection.close()
+    queue.put(result)
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест SQLite: параллельные чтения ленты и запись '
+            'комментариев с настройками по умолчанию и с yatube.sqlite')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5,
+                            help='Секунд на каждый профиль')
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--posts', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Тест рассчитан на SQLite')
+        directory = tempfile.mkdtemp(prefix='bench-sqlite-')
+        try:
+            template = self.prepare(directory, options['posts'])
+            tuned = {'options': dict(settings.DATABASES['default'].get(
+                'OPTIONS', {})), 'persistent': True}
+            for name, profile in (('по умолчанию', BASELINE),
+                                  ('yatube.sqlite', tuned)):
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.copy(template, path, profile)
+                self.report(name, self.run(path, profile, options),
+                            options['duration'])
+        finally:
+            connection.close()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def prepare(self, directory, posts):
+        """Копия текущей базы с миграциями и хотя бы posts постами."""
+        template = os.path.join(directory, 'template.sqlite3')
+        source = connection.settings_dict['NAME']
+        connection.close()
+        if os.path.exists(source):
+            backup(source, template)
+        connection.settings_dict['NAME'] = template
+        call_command('migrate', verbosity=0)
+        author, _ = User.objects.get_or_create(username='bench-sqlite')
+        missing = posts - Post.objects.count()
+        if missing > 0:
+            Post.objects.bulk_create(
+                Post(text=f'Пост {number}', author=author)
+                for number in range(missing))
+        connection.close()
+        return template
+
+    @staticmethod
+    def copy(template, path, profile):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        backup(template, path)
+        # режим журнала хранится в файле: меняем его до запуска воркеров
+        mode = profile['options'].get('pragmas', {}).get(
+            'journal_mode', 'WAL')
+        dst = sqlite3.connect(path)
+        dst.execute(f'PRAGMA journal_mode = {mode}')
+        dst.close()
+
+    @staticmethod
+    def run(path, profile, options):
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        workers = [
+            context.Process(target=run_worker, args=(
+                path, profile, options['duration'], options['write_ratio'],
+                seed, queue))
+            for seed in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        return {
+            'read': [value for item in results for value in item['read']],
+            'write': [value for item in results for value in item['write']],
+            'errors': sum(item['errors'] for item in results),
+        }
+
+    def report(self, name, result, duration):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for kind in ('read', 'write'):
+            timings = result[kind]
+            self.stdout.write(
+                '  %s: %.0f оп/с, p50 %.1f мс, p95 %.1f мс, p99 %.1f мс' % (
+                    'чтение' if kind == 'read' else 'запись',
+                    len(timings) / duration,
+                    statistics.median(timings) * 1000 if timings else 0,
+                    percentile(timings, 0.95) * 1000,
+                    percentile(timings, 0.99) * 1000))
+        self.stdout.write(
+            '  ошибок (database is locked): %d' % result['errors'])
@@ -0,0 +1,199 @@
+import json
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import AuthorCounters, Group
+
+URL_MODULES = ('posts.urls', 'users.urls', 'about.urls')
+# строка запроса для маршрутов, которым без неё нечего показать
+QUERY_STRINGS = {'search': 'q=кот'}
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все маршруты posts, users и about через WSGI-'
+            'приложение в этом же процессе и сохраняет задержки, число '
+            'запросов к базе и размер ответов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Запросов на каждый маршрут')
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--username',
+                            help='Автор для маршрутов с <username>, по '
+                                 'умолчанию - с наибольшим числом постов')
+        parser.add_argument('--json', metavar='FILE',
+                            help='Сохранить результаты в JSON')
+        parser.add_argument('--compare', metavar='FILE',
+                            help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля')
+        routes = self.routes(self.sample(options['username']))
+        reader = self.reader()
+        results = {}
+        # follow/unfollow пишут в базу даже на GET: всё откатывается
+        try:
+            with transaction.atomic(), override_settings(
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for who, user in (('anonymous', None), ('user', reader)):
+                    if who == 'user' and user is None:
+                        continue
+                    client = Client()
+                    if user is not None:
+                        client.force_login(user)
+                    for name, url in routes:
+                        results[f'{name} [{who}]'] = self.measure(
+                            client, url, options)
+                raise Rollback
+        except Rollback:
+            pass
+        data = {
+            'commit': self.commit(),
+            'created': timezone.now().isoformat(),
+            'repeat': options['repeat'],
+            'cold': options['cold'],
+            'results': results,
+        }
+        self.report(results)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as source:
+                self.compare(json.load(source), data)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump(data, output, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def sample(username):
+        """Значения для <username>, <slug> и <post_id> в маршрутах."""
+        counters = AuthorCounters.objects.select_related('user')
+        if username:
+            counters = counters.filter(user__username=username)
+        top = counters.order_by('-posts_count').first()
+        post = group = None
+        if top is not None:
+            post = top.user.posts.order_by('-pub_date', '-id').first()
+        group = Group.objects.filter(posts__isnull=False).first()
+        if post is None or group is None:
+            raise CommandError(
+                'Нужны автор с постами и сообщество: запустите seed_data')
+        return {'username': top.user.username, 'slug': group.slug,
+                'post_id': post.id}
+
+    @staticmethod
+    def reader():
+        """Пользователь с самой большой лентой подписок."""
+        counters = AuthorCounters.objects.select_related('user').order_by(
+            '-following_count').first()
+        return counters.user if counters is not None else None
+
+    @staticmethod
+    def routes(sample):
+        routes = []
+        for module_name in URL_MODULES:
+            module = import_module(module_name)
+            namespace = getattr(module, 'app_name', None)
+            for pattern in module.urlpatterns:
+                name = (f'{namespace}:{pattern.name}' if namespace
+                        else pattern.name)
+                kwargs = {key: sample[key]
+                          for key in pattern.pattern.converters}
+                url = reverse(name, kwargs=kwargs)
+                if pattern.name in QUERY_STRINGS:
+                    url += '?' + QUERY_STRINGS[pattern.name]
+                routes.append((name, url))
+        return routes
+
+    @staticmethod
+    def measure(client, url, options):
+        counter = QueryCounter()
+        timings, queries = [], []
+        status = size = None
+        # первый запрос прогревает шаблоны и соединение и не считается
+        for attempt in range(options['repeat'] + 1):
+            if options['cold']:
+                cache.clear()
+            counter.count = 0
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                started = time.perf_counter()
+                response = client.get(url)
+                content = (b''.join(response.streaming_content)
+                           if response.streaming else response.content)
+                elapsed = time.perf_counter() - started
+            if attempt:
+                timings.append(elapsed)
+                queries.append(counter.count)
+            status, size = response.status_code, len(content)
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(statistics.median(timings) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+            'queries': round(statistics.mean(queries), 2),
+            'bytes': size,
+        }
+
+    @staticmethod
+    def commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                text=True, cwd=settings.BASE_DIR).stdout.strip() or None
+        except OSError:
+            return None
+
+    def report(self, results):
+        self.stdout.write('%-40s %6s %9s %9s %9s %8s %9s' % (
+            'маршрут', 'код', 'p50, мс', 'p95, мс', 'p99, мс', 'запросы',
+            'байт'))
+        for name, row in results.items():
+            self.stdout.write('%-40s %6d %9.1f %9.1f %9.1f %8.1f %9d' % (
+                name, row['status'], row['p50_ms'], row['p95_ms'],
+                row['p99_ms'], row['queries'], row['bytes']))
+
+    def compare(self, before, after):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Сравнение с %s' % (before.get('commit') or 'прошлым прогоном')))
+        for name, row in after['results'].items():
+            old = before['results'].get(name)
+            if old is None:
+                continue
+            change = ((row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+                      if old['p50_ms'] else 0)
+            self.stdout.write('%-40s p50 %+6.1f%%  запросы %+.1f  байт %+d' % (
+                name, change, row['queries'] - old['queries'],
+                row['bytes'] - old['bytes']))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import MODELS, write_csv, write_jsonl
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает сообщества, посты, комментарии и подписки '
+            'в JSONL или CSV')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help='Файл выгрузки, "-" - стандартный вывод')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='По умолчанию - по расширению файла, иначе jsonl')
+        parser.add_argument(
+            '--model', action='append', choices=MODELS, dest='models',
+            help='Выгружаемая модель (можно несколько раз), по умолчанию '
+                 'все; для CSV - ровно одна')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or (
+            'csv' if output.endswith('.csv') else 'jsonl')
+        # порядок выгрузки - порядок зависимостей, а не порядок в --model
+        names = [name for name in MODELS
+                 if name in (options['models'] or MODELS)]
+        if fmt == 'csv' and len(names) != 1:
+            raise CommandError('CSV хранит одну модель: укажите --model')
+        stream = (self.stdout if output == '-'
+                  else open(output, 'w', encoding='utf-8', newline=''))
+        try:
+            if fmt == 'csv':
+                written = write_csv(stream, names[0])
+            else:
+                written = write_jsonl(stream, names)
+        finally:
+            if stream is not self.stdout:
+                stream.close()
+        self.stderr.write(', '.join(
+            f'{name}: {count}' for name, count in written.items()))
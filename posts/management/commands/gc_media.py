@@ -0,0 +1,74 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import Blob, Post, Thumbnail
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы картинок, на которые не ссылается ни один пост, '
+            'вместе с их миниатюрами')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=24 * 60 * 60, metavar='SECONDS',
+            help='Не трогать файлы моложе этого возраста: их загрузка '
+                 'может быть ещё не завершена')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.grace = options['grace']
+        self.storage = Post.image.field.storage
+        removed = self.collect_released(timezone.now() - timedelta(
+            seconds=self.grace))
+        removed += self.collect_orphans()
+        self.stdout.write(f'Удалено файлов: {removed}')
+
+    def collect_released(self, updated_before):
+        removed = 0
+        released = Blob.objects.filter(refcount=0, updated__lt=updated_before)
+        for name in released.values_list('name', flat=True).iterator():
+            if self.remove(name):
+                removed += 1
+        return removed
+
+    def collect_orphans(self):
+        """Файлы в posts/, которые не учтены ни в Blob, ни в постах."""
+        removed = 0
+        root = self.storage.path('posts')
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.storage.location).replace(
+                    os.sep, '/')
+                if (Blob.objects.filter(name=name).exists()
+                        or Post.objects.filter(image=name).exists()):
+                    continue
+                if self.remove(name):
+                    removed += 1
+        return removed
+
+    def remove(self, name):
+        path = self.storage.path(name)
+        if (os.path.exists(path)
+                and time.time() - os.path.getmtime(path) < self.grace):
+            return False
+        self.stdout.write(f'Удаляю {name}')
+        if self.dry_run:
+            return True
+        blobs = Blob.objects.filter(name=name)
+        if blobs.exists() and not blobs.filter(refcount=0).delete()[0]:
+            # пока шла сборка, на файл снова сослались
+            return False
+        thumbnails = Thumbnail.objects.filter(source=name)
+        for thumbnail_name in thumbnails.values_list('name', flat=True):
+            default_storage.delete(thumbnail_name)
+        thumbnails.delete()
+        self.storage.delete(name)
+        return True
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts.transfer import (BATCH_SIZE, MODELS, Importer, TransferError,
+                            read_csv, read_jsonl)
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает сообщества, посты, комментарии и подписки '
+            'из JSONL или CSV пачками bulk_create и пересчитывает счётчики, '
+            'ленты и поисковый индекс')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл выгрузки, "-" - стандартный '
+                                          'ввод')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='По умолчанию - по расширению файла, иначе jsonl')
+        parser.add_argument('--model', choices=MODELS,
+                            help='Модель строк CSV')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['input']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        if fmt == 'csv' and not options['model']:
+            raise CommandError('Для CSV укажите --model')
+        stream = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8', newline=''))
+        importer = Importer(options['batch_size'])
+        try:
+            rows = (read_csv(stream, options['model']) if fmt == 'csv'
+                    else read_jsonl(stream))
+            counts = importer.load(rows)
+        except (TransferError, IntegrityError) as exc:
+            # загрузка идёт одной транзакцией: база осталась как была
+            raise CommandError(f'Загрузка отменена: {exc}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS('Загружено: %s' % ', '.join(
+            f'{name}: {count}' for name, count in counts.items() if count)))
+        if importer.created_users:
+            self.stdout.write(
+                f'Создано пользователей без пароля: {importer.created_users}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stderr.write('Полнотекстовый индекс есть только в SQLite')
+            return
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
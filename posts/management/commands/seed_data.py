@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, сообществами, '
+            'постами, комментариями и подписками; один seed - одни данные')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--images', type=float, default=0, metavar='SHARE',
+            help='Доля постов с картинкой, от 0 до 1')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Начало имён пользователей и slug сообществ')
+        parser.add_argument(
+            '--password',
+            help='Общий пароль пользователей, по умолчанию войти нельзя')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images - доля от 0 до 1')
+        seeder = Seeder(options['seed'], options['prefix'],
+                        options['password'])
+        started = time.perf_counter()
+        try:
+            created = seeder.run(
+                options['users'], options['groups'], options['posts'],
+                options['comments'], options['follows'], options['images'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(
+            'Создано за %.1f с: %s' % (
+                time.perf_counter() - started,
+                ', '.join(f'{name}: {count}'
+                          for name, count in created.items()))))
@@ -0,0 +1,78 @@
+import json
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.slowlog import log_files
+
+# IN (%s, %s, ...) разной длины - один и тот же запрос
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+
+class Command(BaseCommand):
+    help = ('Сводка журнала медленных SQL-запросов: самые затратные '
+            'запросы по суммарному времени')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG,
+                            help='Журнал, по умолчанию SLOW_QUERY_LOG')
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--view', help='Только запросы этого маршрута')
+
+    def handle(self, *args, **options):
+        if not options['log']:
+            raise CommandError('Журнал не настроен: задайте SLOW_QUERY_LOG '
+                               'или --log')
+        files = log_files(options['log'])
+        if not files:
+            raise CommandError(f'Нет файла {options["log"]}')
+        groups = self.summarize(self.records(files), options['view'])
+        top = sorted(groups.items(), key=lambda item: -item[1]['total'])
+        for number, (sql, group) in enumerate(top[:options['top']], 1):
+            self.report(number, sql, group)
+        if not top:
+            self.stdout.write('Медленных запросов нет')
+
+    @staticmethod
+    def summarize(records, view):
+        groups = {}
+        for record in records:
+            if view and record['view'] != view:
+                continue
+            sql = IN_LIST.sub('(%s, ...)', record['sql'])
+            group = groups.setdefault(sql, {
+                'count': 0, 'total': 0.0, 'max': 0.0, 'views': set(),
+                'origins': set(), 'plan': None})
+            group['count'] += 1
+            group['total'] += record['ms']
+            if record['ms'] >= group['max']:
+                # план самого долгого выполнения
+                group['max'] = record['ms']
+                group['plan'] = record.get('plan')
+            group['views'].add(record['view'] or '-')
+            if record.get('origin'):
+                group['origins'].add(record['origin'])
+        return groups
+
+    def report(self, number, sql, group):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            '%d. %.0f мс всего, %d раз, в среднем %.1f мс, максимум '
+            '%.1f мс' % (number, group['total'], group['count'],
+                         group['total'] / group['count'], group['max'])))
+        self.stdout.write('   маршруты: ' + ', '.join(sorted(group['views'])))
+        for origin in sorted(group['origins']):
+            self.stdout.write(f'   откуда: {origin}')
+        self.stdout.write(f'   {sql}')
+        for line in group['plan'] or []:
+            self.stdout.write(f'     {line}')
+
+    def records(self, files):
+        for path in files:
+            with open(path, encoding='utf-8') as source:
+                for line in source:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # строка, оборванная при ротации или сбое
+                        continue
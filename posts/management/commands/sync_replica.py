@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts import cache
+from yatube.routers import replica_alias
+from yatube.sqlite.base import backup
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в реплику для чтения: '
+            'локальная замена репликации')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=float, default=None, metavar='SECONDS',
+            help='Не завершаться, повторять копирование с этим интервалом')
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias is None or alias == DEFAULT_DB_ALIAS:
+            raise CommandError(
+                'Реплика не настроена: задайте YATUBE_REPLICA_PATH')
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replica = settings.DATABASES[alias]
+        if connections[alias].vendor != 'sqlite':
+            raise CommandError('sync_replica копирует только файлы SQLite')
+        while True:
+            started = time.monotonic()
+            backup(primary['NAME'], replica['NAME'])
+            cache.bump('replica')
+            self.stdout.write('Реплика обновлена за %.2f с' % (
+                time.monotonic() - started))
+            if options['loop'] is None:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import enqueue, process_pending
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок из очереди пулом процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Число процессов (0 - без пула, по умолчанию по числу CPU)')
+        parser.add_argument(
+            '--batch', type=int, default=100,
+            help='Сколько задач брать из очереди за раз')
+        parser.add_argument(
+            '--loop', type=float, default=None, metavar='SECONDS',
+            help='Не завершаться, проверять очередь с этим интервалом')
+
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Заново поставить в очередь картинки всех постов')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            sources = Post.objects.exclude(image='').exclude(
+                image__isnull=True).values_list('image', flat=True)
+            for source in sources.distinct().iterator():
+                enqueue(source, force=True)
+        while True:
+            done = process_pending(options['batch'], options['workers'])
+            if done:
+                self.stdout.write(f'Готово миниатюр: {done}')
+            if options['loop'] is None:
+                if done < options['batch']:
+                    break
+            elif done == 0:
+                time.sleep(options['loop'])
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import get_conditional_response
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    """Объявляет максимальное число SQL-запросов на один вызов view."""
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+def anonymous_page_cache(version_func):
+    """
+    Разрешает кэшировать ответ view целиком для анонимных GET.
+
+    version_func получает именованные аргументы из URL и возвращает
+    версию данных страницы (см. posts.cache): смена версии
+    «очищает» ровно те страницы, которые от неё зависят.
+    """
+    def decorator(view_func):
+        view_func.page_cache_version = version_func
+        return view_func
+    return decorator
+
+
+class QueryBudgetMiddleware:
+    """
+    Проверяет бюджеты запросов, объявленные через @query_budget.
+
+    Включается настройкой QUERY_BUDGET: 'log' пишет предупреждение,
+    'raise' бросает QueryBudgetExceeded (для тестов и отладки).
+    """
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'QUERY_BUDGET', None)
+        if self.mode not in ('log', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        executed = []
+
+        def count(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(count))
+            response = self.get_response(request)
+
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None and len(executed) > budget:
+            message = '%s: %d SQL queries, budget is %d' % (
+                request.path, len(executed), budget)
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+
+class PageCacheMiddleware:
+    """
+    Кэш готовых ответов для анонимных читателей.
+
+    Попадание отдаётся из process_view: без вызова view, шаблонов и ORM.
+    Запросы с cookie сессии идут мимо кэша, ответы с формами (CSRF)
+    и установкой cookie не сохраняются. Время жизни - PAGE_CACHE_SECONDS,
+    0 отключает кэш.
+    """
+
+    def __init__(self, get_response):
+        self.timeout = getattr(settings, 'PAGE_CACHE_SECONDS', 0)
+        if not self.timeout:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        key = getattr(request, 'page_cache_key', None)
+        if key is not None and self.cacheable(request, response):
+            cache.set(key, response, self.timeout)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        version_func = getattr(view_func, 'page_cache_version', None)
+        if (version_func is None
+                or request.method not in ('GET', 'HEAD')
+                or settings.SESSION_COOKIE_NAME in request.COOKIES):
+            return None
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        request.page_cache_key = f'page:{version_func(**view_kwargs)}:{url}'
+        response = cache.get(request.page_cache_key)
+        if response is None:
+            return None
+        request.page_cache_key = None
+        return get_conditional_response(
+            request, etag=response.get('ETag'), response=response)
+
+    @staticmethod
+    def cacheable(request, response):
+        return (request.method == 'GET'
+                and response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not request.META.get('CSRF_COOKIE_USED'))
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:01
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _count(queryset, field):
+    # коррелированный подзапрос COUNT(*) по внешнему ключу field
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorCounters = apps.get_model('posts', 'AuthorCounters')
+    # один UPDATE ... SET comment_count = (SELECT COUNT(*) ...)
+    Post.objects.update(comment_count=_count(Comment.objects, 'post'))
+    rows = User.objects.annotate(
+        posts_total=_count(Post.objects, 'author'),
+        followers_total=_count(Follow.objects, 'author'),
+        following_total=_count(Follow.objects, 'user'),
+    ).values_list('pk', 'posts_total', 'followers_total',
+                  'following_total')
+    AuthorCounters.objects.bulk_create((
+        AuthorCounters(user_id=pk, posts_count=posts,
+                       followers_count=followers, following_count=following)
+        for pk, posts, followers, following in rows.iterator()
+    ), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписан')),
+            ],
+            options={
+                'verbose_name': 'Счётчики автора',
+                'verbose_name_plural': 'Счётчики авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Thumbnail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(db_index=True, max_length=255, verbose_name='Исходная картинка')),
+                ('name', models.CharField(max_length=255, verbose_name='Файл миниатюры')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+            ],
+            options={
+                'verbose_name': 'Миниатюра',
+                'verbose_name_plural': 'Миниатюры',
+            },
+        ),
+        migrations.CreateModel(
+            name='ThumbnailTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Исходная картинка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+            ],
+            options={
+                'verbose_name': 'Задача миниатюр',
+                'verbose_name_plural': 'Задачи миниатюр',
+                'ordering': ['created'],
+            },
+        ),
+    ]
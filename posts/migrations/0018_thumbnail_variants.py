@@ -0,0 +1,34 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+
+def enqueue_variants(apps, schema_editor):
+    # у старых миниатюр есть только 960x339 JPEG: строим остальные варианты
+    Thumbnail = apps.get_model('posts', 'Thumbnail')
+    ThumbnailTask = apps.get_model('posts', 'ThumbnailTask')
+    sources = Thumbnail.objects.values_list('source', flat=True).distinct()
+    ThumbnailTask.objects.bulk_create(
+        [ThumbnailTask(source=source) for source in sources],
+        batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnail',
+            name='format',
+            field=models.CharField(default='jpeg', max_length=10, verbose_name='Формат'),
+        ),
+        migrations.AddField(
+            model_name='thumbnail',
+            name='size',
+            field=models.PositiveIntegerField(default=0, verbose_name='Байт'),
+        ),
+        migrations.RunPython(enqueue_variants, migrations.RunPython.noop),
+    ]
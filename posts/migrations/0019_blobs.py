@@ -0,0 +1,44 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:10
+
+from django.db import migrations, models
+import posts.storage
+
+
+def fill_blobs(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Blob = apps.get_model('posts', 'Blob')
+    images = Post.objects.exclude(image='').exclude(
+        image__isnull=True).values('image').annotate(
+        refcount=models.Count('pk'))
+    Blob.objects.bulk_create(
+        [Blob(name=row['image'], refcount=row['refcount'])
+         for row in images.order_by()],
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Файл')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('updated', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменён')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/'),
+        ),
+        migrations.RunPython(fill_blobs, migrations.RunPython.noop),
+    ]
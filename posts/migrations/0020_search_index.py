@@ -0,0 +1,33 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:11
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5("
+        "text, kind UNINDEXED, post_id UNINDEXED, tokenize = 'unicode61')")
+    schema_editor.execute(
+        "INSERT INTO posts_search (rowid, text, kind, post_id) "
+        "SELECT id * 2, text, 'p', id FROM posts_post")
+    schema_editor.execute(
+        "INSERT INTO posts_search (rowid, text, kind, post_id) "
+        "SELECT id * 2 + 1, text, 'c', post_id FROM posts_comment")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
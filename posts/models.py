@@ -1,6 +1,10 @@
-from django.db import models
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
+from .storage import post_image_storage
+
 
 User = get_user_model()
 
@@ -31,16 +35,43 @@ class Post(models.Model):
     group = models.ForeignKey(Group, on_delete=models.SET_NULL, blank=True,
                               verbose_name='Группа', related_name='posts',
                               null=True, help_text='Ссылка на группу')
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image = models.ImageField(upload_to='posts/', blank=True, null=True,
+                              storage=post_image_storage)
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Комментариев')
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name_plural = 'Посты'
         verbose_name = 'Пост'
+        # ленты сортируются по (-pub_date, -id): индекс отдаёт страницу
+        # в нужном порядке без сортировки
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # исходная группа нужна для сброса кэша старого сообщества,
+        # исходная картинка - чтобы не ставить в очередь миниатюры повторно
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # счётчики и лента обновляются в сигналах в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -55,6 +86,14 @@ class Comment(models.Model):
         ordering = ['-created']
         verbose_name_plural = 'Комментарии'
         verbose_name = 'Комментарий'
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class Follow(models.Model):
@@ -68,3 +107,140 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique follow')
         ]
+        # уникальный индекс (user, author) не помогает искать подписчиков
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class AuthorCountersManager(models.Manager):
+    def for_user(self, user):
+        counters = self.filter(user=user).first()
+        return counters or self.model(user=user)
+
+    def bump(self, user_id, field, delta):
+        counters = self.filter(user_id=user_id)
+        if delta > 0:
+            self.get_or_create(user_id=user_id)
+        else:
+            # при каскадном удалении автора строки счётчиков уже может не быть
+            counters = counters.filter(**{f'{field}__gte': -delta})
+        counters.update(**{field: models.F(field) + delta})
+
+
+class AuthorCounters(models.Model):
+    """Денормализованные счётчики автора, обновляются сигналами."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='counters',
+                                verbose_name='Автор')
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name='Записей')
+    followers_count = models.PositiveIntegerField(default=0,
+                                                  verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(default=0,
+                                                  verbose_name='Подписан')
+
+    objects = AuthorCountersManager()
+
+    class Meta:
+        verbose_name_plural = 'Счётчики авторов'
+        verbose_name = 'Счётчики автора'
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок: пост автора, размноженный подписчику."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             verbose_name='Подписчик', related_name='feed')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               verbose_name='Автор', related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             verbose_name='Пост', related_name='feed')
+    pub_date = models.DateTimeField('date published')
+
+    class Meta:
+        verbose_name_plural = 'Записи лент'
+        verbose_name = 'Запись ленты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique feed entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date'],
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+
+
+class Thumbnail(models.Model):
+    """Готовая миниатюра картинки поста (создаётся воркером thumbnails)."""
+    source = models.CharField(max_length=255, db_index=True,
+                              verbose_name='Исходная картинка')
+    name = models.CharField(max_length=255, verbose_name='Файл миниатюры')
+    width = models.PositiveIntegerField(verbose_name='Ширина')
+    height = models.PositiveIntegerField(verbose_name='Высота')
+    format = models.CharField(max_length=10, default='jpeg',
+                              verbose_name='Формат')
+    size = models.PositiveIntegerField(default=0, verbose_name='Байт')
+
+    class Meta:
+        verbose_name_plural = 'Миниатюры'
+        verbose_name = 'Миниатюра'
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def url(self):
+        return default_storage.url(self.name)
+
+
+class ThumbnailTask(models.Model):
+    """Очередь картинок, для которых ещё нет миниатюр."""
+    source = models.CharField(max_length=255, unique=True,
+                              verbose_name='Исходная картинка')
+    created = models.DateTimeField('created', auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попыток')
+
+    class Meta:
+        ordering = ['created']
+        verbose_name_plural = 'Задачи миниатюр'
+        verbose_name = 'Задача миниатюр'
+
+    def __str__(self):
+        return self.source
+
+
+class BlobManager(models.Manager):
+    def bump(self, name, delta):
+        blobs = self.filter(name=name)
+        if delta > 0:
+            self.get_or_create(name=name)
+        else:
+            blobs = blobs.filter(refcount__gte=-delta)
+        blobs.update(refcount=models.F('refcount') + delta,
+                     updated=timezone.now())
+
+
+class Blob(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него ссылаются."""
+    name = models.CharField(max_length=255, primary_key=True,
+                            verbose_name='Файл')
+    refcount = models.PositiveIntegerField(default=0, verbose_name='Ссылок')
+    updated = models.DateTimeField(auto_now=True, db_index=True,
+                                   verbose_name='Изменён')
+
+    objects = BlobManager()
+
+    class Meta:
+        verbose_name_plural = 'Файлы картинок'
+        verbose_name = 'Файл картинки'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,193 @@
+import base64
+import binascii
+import datetime
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+CURSOR_PARAM = 'cursor'
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorEncoder(json.JSONEncoder):
+    # DjangoJSONEncoder обрезает микросекунды, а ключу нужна точность
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorPage(Sequence):
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация по упорядоченным полям без COUNT(*) и OFFSET.
+
+    Поля ordering должны однозначно упорядочивать выборку (последним
+    обычно идёт первичный ключ) и быть доступны как атрибуты объектов
+    или ключи словарей для .values().
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    def get_page(self, cursor=None):
+        try:
+            direction, values = self.decode(cursor)
+        except InvalidCursor:
+            direction, values = NEXT, None
+        return self.page(direction, values)
+
+    def page(self, direction=NEXT, values=None):
+        ordering = self.ordering
+        if direction == PREVIOUS:
+            ordering = tuple(_reverse(field) for field in ordering)
+        queryset = self.object_list.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction == PREVIOUS:
+            items.reverse()
+
+        next_cursor = previous_cursor = None
+        if items:
+            if direction == NEXT and has_more or direction == PREVIOUS:
+                next_cursor = self.encode(NEXT, items[-1])
+            if direction == PREVIOUS and has_more or (
+                    direction == NEXT and values is not None):
+                previous_cursor = self.encode(PREVIOUS, items[0])
+        return CursorPage(items, self, next_cursor, previous_cursor)
+
+    def encode(self, direction, item):
+        return encode_cursor(direction, [
+            _value(item, field.lstrip('-')) for field in self.ordering])
+
+    def decode(self, cursor):
+        return decode_cursor(cursor, len(self.ordering), [
+            _field(self.object_list, field.lstrip('-'))
+            for field in self.ordering])
+
+    @staticmethod
+    def _after(ordering, values):
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+        condition = Q()
+        for index in reversed(range(len(ordering))):
+            field = ordering[index].lstrip('-')
+            lookup = 'lt' if ordering[index].startswith('-') else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[index]})
+            if index < len(ordering) - 1:
+                step |= Q(**{field: values[index]}) & condition
+            condition = step
+        return condition
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, values], cls=CursorEncoder)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length, fields=None):
+    """
+    Разбирает курсор в (направление, значения ключа) или InvalidCursor.
+
+    Значения приводятся к типам полей fields: подделанный курсор не должен
+    доходить до фильтра запроса.
+    """
+    if not cursor:
+        return NEXT, None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if (direction not in (NEXT, PREVIOUS)
+            or not isinstance(values, list)
+            or len(values) != length):
+        raise InvalidCursor(cursor)
+    if fields is not None:
+        try:
+            values = [field.to_python(value)
+                      for field, value in zip(fields, values)]
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        if None in values:
+            raise InvalidCursor(cursor)
+    return direction, values
+
+
+def _reverse(field):
+    return field[1:] if field.startswith('-') else '-' + field
+
+
+def _field(queryset, name):
+    # поле модели или аннотации (feed_pub_date в ленте подписок)
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    if name == 'pk':
+        return queryset.model._meta.pk
+    try:
+        return queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise ValueError(f'Курсор не поддерживает поле {name!r}')
+
+
+def _value(item, field):
+    if isinstance(item, dict):
+        return item[field]
+    return getattr(item, field)
+
+
+def paginate(request, object_list, ordering=('-pub_date', '-id')):
+    """
+    Возвращает (paginator, page) для списка постов.
+
+    По умолчанию используется обычный Paginator с ?page=N; курсорный
+    режим включается настройкой CURSOR_PAGINATION или параметром ?cursor=.
+    """
+    if (getattr(settings, 'CURSOR_PAGINATION', False)
+            or CURSOR_PARAM in request.GET):
+        paginator = CursorPaginator(object_list, settings.TEN_POSTS, ordering)
+        return paginator, paginator.get_page(request.GET.get(CURSOR_PARAM))
+    paginator = Paginator(object_list, settings.TEN_POSTS)
+    return paginator, paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,114 @@
+"""
+Ограничение частоты записей: посты, комментарии, подписки.
+
+Лимиты задаются в settings.RATE_LIMITS по областям: 'N/период' для
+одного пользователя и для одного IP. Пользователь узнаётся по id в
+сессии, поэтому отказ 429 стоит одного чтения сессии и обращений
+к кэшу. Счёт ведётся скользящим окном: счётчик текущего
+окна плюс доля счётчика предыдущего, счётчики увеличиваются атомарно
+через cache.incr.
+"""
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from yatube import metrics
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+RATE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+metrics.describe('yatube_ratelimit_rejected_total', 'counter',
+                 'Запросы, отклонённые ограничением частоты')
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60), '5/10m' -> (5, 600)."""
+    match = RATE.match(rate)
+    if match is None:
+        raise ValueError(f'Неверный лимит: {rate!r}')
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+def hit(key, rate):
+    """
+    Учитывает попытку и возвращает, сколько секунд ждать (0 - можно).
+    """
+    limit, period = parse_rate(rate)
+    now = time.time()
+    window = int(now // period)
+    current = f'ratelimit:{key}:{window}'
+    cache.add(current, 0, period * 2)
+    try:
+        count = cache.incr(current)
+    except ValueError:
+        # запись вытеснили между add и incr
+        cache.set(current, 1, period * 2)
+        count = 1
+    previous = cache.get(f'ratelimit:{key}:{window - 1}', 0)
+    elapsed = now - window * period
+    if previous * (1 - elapsed / period) + count <= limit:
+        return 0
+    return max(1, int(period - elapsed))
+
+
+def identities(request):
+    """Ключи, по которым считаются попытки: пользователь и IP."""
+    # id вошедшего пользователя из сессии, без запроса к auth_user:
+    # новая сессия того же пользователя попадает в ту же корзину, а
+    # выдуманная cookie не даёт id и считается только по IP
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is not None:
+        yield 'user', str(user_id)
+    # за прокси REMOTE_ADDR должен выставлять сам прокси-сервер
+    yield 'ip', request.META.get('REMOTE_ADDR', '')
+
+
+def check(scope, request):
+    """Секунды до следующей разрешённой попытки или 0."""
+    limits = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+    if not limits:
+        return 0
+    user_rate, ip_rate = limits
+    rates = {'user': user_rate, 'ip': ip_rate}
+    for kind, identity in identities(request):
+        if not rates[kind]:
+            continue
+        retry_after = hit(f'{scope}:{kind}:{identity}', rates[kind])
+        if retry_after:
+            metrics.inc('yatube_ratelimit_rejected_total', scope=scope,
+                        key=kind)
+            return retry_after
+    return 0
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse('Слишком много запросов, попробуйте позже.',
+                            content_type='text/plain; charset=utf-8',
+                            status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(scope, methods=('POST',)):
+    """
+    Ограничивает частоту запросов к view по лимитам области scope.
+
+    Ставится над login_required: превышение - ответ 429 с Retry-After
+    без запросов к пользователям и постам.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                retry_after = check(scope, request)
+                if retry_after:
+                    return too_many_requests(retry_after)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
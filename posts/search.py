@@ -0,0 +1,182 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Индекс - виртуальная таблица FTS5 posts_search (миграция 0020),
+по строке на пост (rowid = id * 2) и на комментарий (rowid = id * 2 + 1).
+Сигналы обновляют индекс при сохранении и удалении, полная
+перестройка - `manage.py search_index`.
+
+Пост ранжируется по лучшему совпадению среди его текста и
+комментариев (rank FTS5 - это bm25, вес комментариев вдвое меньше). Выдача
+постраничная по ключу (score, post_id), без OFFSET. Оценка поста - минимум
+по всем его совпадениям, поэтому условие курсора нельзя проверить по
+отдельной строке индекса: ранжирование выполняется один раз на запрос
+(первые SEARCH_RESULTS постов) и кэшируется до изменения постов или
+комментариев, следующие страницы берут срез из кэша.
+"""
+import hashlib
+import re
+from bisect import bisect_right
+
+from django.core.cache import cache
+from django.db import (DEFAULT_DB_ALIAS, connection, connections, router,
+                       transaction)
+from django.db.models import FloatField, IntegerField, Q
+from django.db.models.expressions import RawSQL
+
+from .cache import FRAGMENT_TIMEOUT, index_version
+from .models import Post
+from .paginator import (CursorPage, CursorPaginator, InvalidCursor, NEXT,
+                        decode_cursor, encode_cursor)
+
+TABLE = 'posts_search'
+POST = 'p'
+COMMENT = 'c'
+COMMENT_WEIGHT = 0.5
+# длинные запросы обрезаются: каждое слово - отдельный терм FTS
+MAX_TERMS = 8
+# глубина выдачи: столько лучших постов ранжируется и кэшируется
+SEARCH_RESULTS = 1000
+CURSOR_FIELDS = (FloatField(), IntegerField())
+
+_SEARCH_SQL = f'''
+SELECT post_id, MIN(score) AS best FROM (
+    SELECT post_id, CASE kind WHEN '{COMMENT}'
+        THEN rank * {COMMENT_WEIGHT} ELSE rank END AS score
+    FROM {TABLE} WHERE {TABLE} MATCH %s
+) GROUP BY post_id
+ORDER BY best, post_id LIMIT %s
+'''
+
+
+def is_supported(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'sqlite'
+
+
+def build_query(text):
+    """
+    Переводит ввод пользователя в запрос FTS5.
+
+    Синтаксис FTS (кавычки, NEAR, OR, *) не пропускается: каждое слово
+    берётся в кавычки и ищется по префиксу, слова соединяются через AND.
+    """
+    terms = re.findall(r'\w+', text.lower())[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_post(post):
+    _write(post.pk * 2, post.text, POST, post.pk)
+
+
+def index_comment(comment):
+    _write(comment.pk * 2 + 1, comment.text, COMMENT, comment.post_id)
+
+
+def remove_post(post_id):
+    _remove(post_id * 2)
+
+
+def remove_comment(comment_id):
+    _remove(comment_id * 2 + 1)
+
+
+def rebuild_index():
+    """Заполняет индекс заново из таблиц постов и комментариев."""
+    if not is_supported():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, kind, post_id) '
+            f"SELECT id * 2, text, '{POST}', id FROM posts_post")
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, kind, post_id) '
+            f"SELECT id * 2 + 1, text, '{COMMENT}', post_id "
+            f'FROM posts_comment')
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+def _write(rowid, text, kind, post_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {TABLE} (rowid, text, kind, post_id) '
+            'VALUES (%s, %s, %s, %s)', [rowid, text, kind, post_id])
+
+
+def _remove(rowid):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+
+
+def matching_ids(text, kind):
+    """
+    Подзапрос с id постов (kind=POST) или комментариев (kind=COMMENT),
+    подходящих под запрос, - для фильтра pk__in.
+    """
+    column = 'post_id' if kind == POST else '(rowid - 1) / 2'
+    return RawSQL(
+        f'SELECT {column} FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s',
+        [build_query(text), kind])
+
+
+class SearchPaginator:
+    """Постраничная выдача поиска по ключу (score, post_id)."""
+
+    def __init__(self, text, per_page):
+        self.text = text
+        self.query = build_query(text)
+        self.per_page = int(per_page)
+
+    def get_page(self, cursor=None):
+        try:
+            direction, values = decode_cursor(cursor, 2, CURSOR_FIELDS)
+        except InvalidCursor:
+            direction, values = NEXT, None
+        if direction != NEXT:
+            values = None
+        if not self.query:
+            return CursorPage([], self)
+        using = router.db_for_read(Post)
+        if not is_supported(using):
+            return self._fallback_page(cursor)
+
+        rows = self.ranking(using)
+        start = 0
+        if values is not None:
+            start = bisect_right([(best, post_id) for post_id, best in rows],
+                                 tuple(values))
+        page = rows[start:start + self.per_page]
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [post_id for post_id, _ in page])
+        items = [posts[post_id] for post_id, _ in page if post_id in posts]
+        next_cursor = None
+        if page and start + self.per_page < len(rows):
+            post_id, score = page[-1]
+            next_cursor = encode_cursor(NEXT, [score, post_id])
+        return CursorPage(items, self, next_cursor)
+
+    def ranking(self, using=DEFAULT_DB_ALIAS):
+        """[(post_id, score)] лучших SEARCH_RESULTS постов по запросу."""
+        digest = hashlib.md5(self.query.encode()).hexdigest()
+        key = f'search:{digest}:{index_version()}'
+        rows = cache.get(key)
+        if rows is None:
+            with connections[using].cursor() as db_cursor:
+                db_cursor.execute(_SEARCH_SQL, [self.query, SEARCH_RESULTS])
+                rows = [tuple(row) for row in db_cursor.fetchall()]
+            cache.set(key, rows, FRAGMENT_TIMEOUT)
+        return rows
+
+    def _fallback_page(self, cursor):
+        # без FTS: LIKE по постам и комментариям, свежие сначала
+        condition = Q()
+        for term in re.findall(r'\w+', self.text)[:MAX_TERMS]:
+            condition &= (Q(text__icontains=term)
+                          | Q(comments__text__icontains=term))
+        posts = Post.objects.select_related('author', 'group').filter(
+            condition).distinct()
+        return CursorPaginator(posts, self.per_page).get_page(cursor)
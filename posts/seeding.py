@@ -0,0 +1,140 @@
+"""
+Синтетические данные в масштабе живого сайта.
+
+Все значения берутся из random.Random(seed): один и тот же seed даёт
+те же тексты, даты, авторство и граф подписок. Авторы, сообщества
+и посты распределены по степенному закону (закон Ципфа): немногие
+популярные авторы пишут большую часть постов и собирают большую часть
+подписчиков и комментариев, как и в живой базе.
+"""
+import itertools
+import random
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from .models import Comment, Follow, Group, Post, User
+from .transfer import explicit_dates, rebuild_derived
+
+BATCH_SIZE = 2000
+# даты отсчитываются от постоянного момента, а не от now()
+END = datetime(2024, 1, 1, tzinfo=timezone.utc)
+PERIOD_MINUTES = 365 * 24 * 60
+IMAGE_VARIANTS = 16
+WORDS = (
+    'кот собака утро город река лес море книга музыка кофе дорога поезд '
+    'дом окно снег дождь солнце ветер друг работа отпуск фото рецепт '
+    'сад велосипед горы вечер праздник история идея'
+).split()
+
+
+def zipf(count):
+    """Накопленные веса закона Ципфа: k-й элемент в k раз реже первого."""
+    return list(itertools.accumulate(1 / rank for rank in range(
+        1, count + 1)))
+
+
+def bulk_create(model, objects, batch_size=BATCH_SIZE):
+    batch = []
+    for item in objects:
+        batch.append(item)
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+
+
+class Seeder:
+    def __init__(self, seed=1, prefix='seed', password=None):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        # один хеш на всех: PBKDF2 на каждого пользователя - минуты
+        self.password = make_password(password)
+
+    def power_law(self, items, count):
+        return self.rng.choices(items, cum_weights=zipf(len(items)), k=count)
+
+    def moment(self):
+        return END - timedelta(minutes=self.rng.randrange(PERIOD_MINUTES))
+
+    def text(self, low, high):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize()
+
+    def image(self, number):
+        """Картинка-заглушка, одинаковая для одного seed и номера."""
+        picture = Image.new('RGB', (960, 540), tuple(
+            self.rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(picture)
+        for _ in range(8):
+            x, y = self.rng.randrange(960), self.rng.randrange(540)
+            draw.ellipse((x, y, x + self.rng.randint(40, 300),
+                          y + self.rng.randint(40, 300)),
+                         fill=tuple(self.rng.randrange(256)
+                                    for _ in range(3)))
+        output = BytesIO()
+        picture.save(output, 'JPEG', quality=80)
+        storage = Post.image.field.storage
+        return storage.save(f'posts/{self.prefix}-{number}.jpg',
+                            ContentFile(output.getvalue()))
+
+    @transaction.atomic
+    def run(self, users, groups, posts, comments, follows, image_share=0):
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise ValueError(
+                f'Пользователи с префиксом {self.prefix!r} уже есть')
+        bulk_create(User, (
+            User(username=f'{self.prefix}{number}', password=self.password,
+                 first_name=self.text(1, 1))
+            for number in range(users)))
+        users = list(User.objects.filter(
+            username__startswith=self.prefix).order_by('id'))
+        bulk_create(Group, (
+            Group(title=self.text(1, 3), slug=f'{self.prefix}-{number}',
+                  description=self.text(5, 20))
+            for number in range(groups)))
+        groups = list(Group.objects.filter(
+            slug__startswith=f'{self.prefix}-').order_by('id'))
+        images = [self.image(number) for number in range(
+            IMAGE_VARIANTS if image_share else 0)]
+        last_post = Post.objects.aggregate(last=Max('id'))['last'] or 0
+        last_comment = Comment.objects.aggregate(last=Max('id'))['last'] or 0
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Comment._meta.get_field('created')):
+            bulk_create(Post, (
+                Post(text=self.text(5, 60), author=author, group=group,
+                     pub_date=self.moment(),
+                     image=(self.rng.choice(images)
+                            if self.rng.random() < image_share else ''))
+                for author, group in zip(
+                    self.power_law(users, posts),
+                    self.power_law(groups + [None] * max(len(groups), 1),
+                                   posts))))
+            post_ids = list(Post.objects.filter(
+                id__gt=last_post).order_by('id').values_list('id', flat=True))
+            bulk_create(Comment, (
+                Comment(post_id=post_id, author=self.rng.choice(users),
+                        text=self.text(2, 30), created=self.moment())
+                for post_id in (self.power_law(post_ids, comments)
+                                if post_ids else ())))
+        pairs = dict.fromkeys(zip(
+            (user.id for user in self.rng.choices(users, k=follows)),
+            (user.id for user in self.power_law(users, follows))))
+        bulk_create(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs if user_id != author_id))
+        rebuild_derived()
+        return {
+            'users': len(users),
+            'groups': len(groups),
+            'posts': len(post_ids),
+            'comments': Comment.objects.filter(id__gt=last_comment).count(),
+            'follows': Follow.objects.filter(
+                user__username__startswith=self.prefix).count(),
+        }
@@ -0,0 +1,131 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, feed, search, thumbnails
+from .models import (AuthorCounters, Blob, Comment, Follow, Group, Post,
+                     User)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorCounters.objects.bump(instance.author_id, 'posts_count', 1)
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, raw=False, **kwargs):
+    old_image = getattr(instance, '_loaded_image', None) or None
+    new_image = instance.image.name if instance.image else None
+    if raw or new_image == old_image:
+        return
+    if new_image:
+        Blob.objects.bump(new_image, 1)
+        thumbnails.enqueue(new_image)
+    if old_image:
+        Blob.objects.bump(old_image, -1)
+    instance._loaded_image = new_image
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    AuthorCounters.objects.bump(instance.author_id, 'posts_count', -1)
+    if instance.image:
+        Blob.objects.bump(instance.image.name, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+        if Comment.post.is_cached(instance):
+            instance.post.comment_count += 1
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorCounters.objects.bump(instance.author_id, 'followers_count', 1)
+        AuthorCounters.objects.bump(instance.user_id, 'following_count', 1)
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    AuthorCounters.objects.bump(instance.author_id, 'followers_count', -1)
+    AuthorCounters.objects.bump(instance.user_id, 'following_count', -1)
+    feed.cleanup(instance.user_id, instance.author_id)
+
+
+# Поисковый индекс
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_indexed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_unindexed(sender, instance, **kwargs):
+    search.remove_comment(instance.pk)
+
+
+# Сброс поколений кэша лент
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.bump(*cache.post_scopes(
+            instance, getattr(instance, '_loaded_group_id', None)))
+        instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        scopes = cache.comment_scopes(instance.post_id)
+        if scopes:
+            cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # счётчики подписок видны в карточках обоих пользователей
+        cache.bump(f'follow:{instance.user_id}',
+                   f'author:{instance.author.username}',
+                   f'author:{instance.user.username}')
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # вход обновляет только last_login, который на страницах не виден
+    if not raw and set(update_fields or ()) != {'last_login'}:
+        cache.bump(f'author:{instance.username}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.bump('groups', f'group:{instance.slug}')
@@ -0,0 +1,57 @@
+"""
+Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под именем из sha256 содержимого, поэтому одинаковые
+загрузки хранятся один раз и делят миниатюры. Ссылки на файлы
+считаются в модели Blob, удаление файлов без ссылок выполняет
+команда `manage.py gc_media`.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # одинаковое содержимое должно получать одно и то же имя
+        return name
+
+    def content_name(self, name, digest):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest[2:4],
+                              digest + extension)
+
+    def _save(self, name, content):
+        os.makedirs(self.location, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=self.location,
+                                             prefix='.upload-')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            name = self.content_name(name, digest.hexdigest())
+            path = self.path(name)
+            if os.path.exists(path):
+                # свежая отметка времени защищает файл от сборщика мусора
+                os.utime(path)
+                return name
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # mkstemp создаёт файл с правами 0600
+            mode = self.file_permissions_mode
+            os.chmod(temporary, 0o644 if mode is None else mode)
+            os.replace(temporary, path)
+            return name
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+post_image_storage = ContentAddressedStorage()
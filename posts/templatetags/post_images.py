@@ -0,0 +1,17 @@
+from django import template
+
+from posts.thumbnails import card_thumbnail, prefetch_thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    return card_thumbnail(post)
+
+
+@register.simple_tag
+def prefetch_page_thumbnails(page):
+    """Загружает миниатюры всех постов страницы одним обращением."""
+    prefetch_thumbnails(page)
+    return ''
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import NEXT, encode_cursor
+
+
+@override_settings(QUERY_BUDGET='raise')
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username='Author')
+        cls.reader = get_user_model().objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        for number in range(13):
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group)
+        cls.post = Post.objects.latest('pub_date')
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ApiTest.reader)
+
+    def test_cursor_pages_cover_all_posts(self):
+        url = reverse('api:posts')
+        seen = []
+        while url:
+            data = self.guest_client.get(url).json()
+            seen += [item['id'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(seen, list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True)))
+
+    def test_tampered_cursor_returns_first_page(self):
+        for name, values in (('api:posts', ['вчера', 1]),
+                             ('api:follow', [1, 'один'])):
+            with self.subTest(name=name):
+                client = (self.authorized_client if name == 'api:follow'
+                          else self.guest_client)
+                response = client.get(reverse(name), {
+                    'cursor': encode_cursor(NEXT, values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json()['results'])
+
+    def test_sparse_fields(self):
+        data = self.guest_client.get(
+            reverse('api:posts'), {'fields': 'id,author'}).json()
+        self.assertEqual(data['results'][0],
+                         {'id': ApiTest.post.pk, 'author': 'Author'})
+        self.assertIn('fields=id%2Cauthor', data['next'])
+        response = self.guest_client.get(
+            reverse('api:posts'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_group_profile_and_post(self):
+        data = self.guest_client.get(
+            reverse('api:group_posts', args=['test'])).json()
+        self.assertEqual(data['group']['slug'], 'test')
+        self.assertEqual(len(data['results']), 10)
+        data = self.guest_client.get(
+            reverse('api:profile', args=['Author'])).json()
+        self.assertEqual(data['author']['posts_count'], 13)
+        self.assertEqual(data['author']['followers_count'], 1)
+        data = self.guest_client.get(reverse(
+            'api:post', args=['Author', ApiTest.post.pk])).json()
+        self.assertEqual(data['comment_count'], 1)
+        self.assertEqual(
+            [item['text'] for item in data['comments']['results']],
+            ['Комментарий'])
+        response = self.guest_client.get(
+            reverse('api:group_posts', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_feed_requires_login(self):
+        url = reverse('api:follow')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        response = self.authorized_client.get(url)
+        self.assertEqual(len(response.json()['results']), 10)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_cache_headers_and_conditional_get(self):
+        url = reverse('api:profile', args=['Author'])
+        response = self.guest_client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_read_only(self):
+        response = self.authorized_client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
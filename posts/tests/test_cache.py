@@ -0,0 +1,300 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import check_version_cache, index_version
+from posts.middleware import PageCacheMiddleware
+from posts.models import Comment, Follow, Group, Post
+from yatube.cache import SQLiteCache
+
+
+class FragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тест',
+            slug='test',
+            description='Домашние тесты',
+        )
+        cls.author = get_user_model().objects.create_user(username='Author')
+        cls.reader = get_user_model().objects.create_user(username='Reader')
+        cls.post = Post.objects.create(text='Первый пост', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FragmentCacheTest.reader)
+
+    def get_content(self, client, url):
+        return client.get(url).content.decode()
+
+    def test_new_post_is_visible_immediately(self):
+        urls = [
+            reverse('index'),
+            reverse('group_posts', args=[FragmentCacheTest.group.slug]),
+            reverse('profile', args=[FragmentCacheTest.author.username]),
+        ]
+        for url in urls:
+            self.get_content(self.guest_client, url)
+        Post.objects.create(text='Свежий пост',
+                            author=FragmentCacheTest.author,
+                            group=FragmentCacheTest.group)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIn('Свежий пост',
+                              self.get_content(self.guest_client, url))
+
+    def test_unchanged_page_is_served_from_cache(self):
+        url = reverse('index')
+        self.get_content(self.guest_client, url)
+        Post.objects.filter(pk=FragmentCacheTest.post.pk).update(
+            text='Тихая правка')
+        self.assertIn('Первый пост', self.get_content(self.guest_client, url))
+
+    def test_follow_feed_is_not_shared_between_users(self):
+        Follow.objects.create(user=FragmentCacheTest.reader,
+                              author=FragmentCacheTest.author)
+        self.assertIn('Первый пост', self.get_content(
+            self.authorized_client, reverse('follow_index')))
+        stranger = get_user_model().objects.create_user(username='Stranger')
+        stranger_client = Client()
+        stranger_client.force_login(stranger)
+        self.assertNotIn('Первый пост', self.get_content(
+            stranger_client, reverse('follow_index')))
+
+    def test_comment_updates_cached_counter(self):
+        self.get_content(self.guest_client, reverse('index'))
+        Comment.objects.create(post=FragmentCacheTest.post,
+                               author=FragmentCacheTest.reader, text='Вау')
+        self.assertIn('Комментариев: 1',
+                      self.get_content(self.guest_client, reverse('index')))
+
+    def test_follow_feed_sees_posts_and_comments_of_followed_authors(self):
+        Follow.objects.create(user=FragmentCacheTest.reader,
+                              author=FragmentCacheTest.author)
+        url = reverse('follow_index')
+        self.get_content(self.authorized_client, url)
+        Comment.objects.create(post=FragmentCacheTest.post,
+                               author=FragmentCacheTest.reader, text='Вау')
+        self.assertIn('Комментариев: 1',
+                      self.get_content(self.authorized_client, url))
+        Post.objects.create(text='Для подписчиков',
+                            author=FragmentCacheTest.author)
+        self.assertIn('Для подписчиков',
+                      self.get_content(self.authorized_client, url))
+
+    def test_comment_bump_does_not_grow_with_followers(self):
+        for number in range(20):
+            follower = get_user_model().objects.create_user(
+                username=f'follower{number}')
+            Follow.objects.create(user=follower,
+                                  author=FragmentCacheTest.author)
+        with mock.patch('posts.cache.bump') as bump, \
+                CaptureQueriesContext(connection) as queries:
+            Comment.objects.create(post=FragmentCacheTest.post,
+                                   author=FragmentCacheTest.reader,
+                                   text='Вау')
+        self.assertFalse([query for query in queries
+                          if 'posts_follow' in query['sql']])
+        self.assertEqual(len([query for query in queries
+                              if query['sql'].startswith('SELECT')]), 1)
+        scopes = bump.call_args[0]
+        self.assertEqual(len(scopes), 4)
+        self.assertIn(f'posts:{FragmentCacheTest.author.pk}', scopes)
+
+    def test_group_rename_updates_cards(self):
+        self.get_content(self.guest_client, reverse('index'))
+        group = FragmentCacheTest.group
+        group.title = 'Новое название'
+        group.save()
+        self.assertIn('Новое название',
+                      self.get_content(self.guest_client, reverse('index')))
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        cls.other = Group.objects.create(title='Другое', slug='other')
+        cls.author = get_user_model().objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Первый пост', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_hit_skips_view_and_orm(self):
+        urls = [
+            reverse('index'),
+            reverse('group_posts', args=['test']),
+            reverse('profile', args=['Author']),
+            reverse('post', args=['Author', PageCacheTest.post.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(url)
+                self.assertIsNone(second.context)
+                self.assertEqual(second.content, first.content)
+
+    def test_change_purges_only_affected_pages(self):
+        group_url = reverse('group_posts', args=['test'])
+        other_url = reverse('group_posts', args=['other'])
+        self.guest_client.get(group_url)
+        self.guest_client.get(other_url)
+        Post.objects.create(text='Свежий пост', author=PageCacheTest.author,
+                            group=PageCacheTest.group)
+        response = self.guest_client.get(group_url)
+        self.assertContains(response, 'Свежий пост')
+        self.assertIsNotNone(response.context)
+        self.assertIsNone(self.guest_client.get(other_url).context)
+
+    def test_comment_purges_post_page(self):
+        url = reverse('post', args=['Author', PageCacheTest.post.pk])
+        self.guest_client.get(url)
+        Comment.objects.create(post=PageCacheTest.post,
+                               author=PageCacheTest.author, text='Ответ')
+        self.assertContains(self.guest_client.get(url), 'Ответ')
+
+    def test_session_bypasses_cache(self):
+        url = reverse('index')
+        self.guest_client.get(url)
+        client = Client()
+        client.force_login(PageCacheTest.author)
+        self.assertIsNotNone(client.get(url).context)
+        # страница для вошедшего пользователя не попадает в кэш анонимов
+        self.assertNotIn('Создать новую запись',
+                         self.guest_client.get(url).content.decode())
+
+    def test_pages_with_csrf_forms_or_cookies_are_not_stored(self):
+        request = RequestFactory().get('/')
+        self.assertTrue(PageCacheMiddleware.cacheable(
+            request, HttpResponse()))
+        request.META['CSRF_COOKIE_USED'] = True
+        self.assertFalse(PageCacheMiddleware.cacheable(
+            request, HttpResponse()))
+        response = HttpResponse()
+        response.set_cookie('messages', 'x')
+        self.assertFalse(PageCacheMiddleware.cacheable(
+            RequestFactory().get('/'), response))
+
+    def test_cached_page_answers_conditional_get(self):
+        url = reverse('profile', args=['Author'])
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class VersionTokenTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(CACHE_VERSION_TIMEOUT=20)
+    def test_tokens_expire_in_process_local_cache(self):
+        version = index_version()
+        self.assertEqual(index_version(), version)
+        with mock.patch('time.time', return_value=time.time() + 21):
+            self.assertNotEqual(index_version(), version)
+
+    @override_settings(CACHE_VERSION_TIMEOUT=None)
+    def test_unbounded_tokens_need_shared_cache(self):
+        self.assertEqual([error.id for error in check_version_cache(None)],
+                         ['posts.W001'])
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'yatube.cache.SQLiteCache',
+                'LOCATION': os.path.join(tempfile.gettempdir(), 'x')}}):
+            self.assertEqual(check_version_cache(None), [])
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        self.cache.set('text', {'a': 1})
+        self.assertEqual(self.cache.get('text'), {'a': 1})
+        self.assertFalse(self.cache.add('text', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.assertEqual(self.cache.get_many(['text', 'new', 'missing']),
+                         {'text': {'a': 1}, 'new': 'value'})
+        self.cache.delete('text')
+        self.assertIsNone(self.cache.get('text'))
+        self.cache.set('expired', 1, timeout=0)
+        self.assertIsNone(self.cache.get('expired'))
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(self.make_cache().get('key'), 'value')
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_increment, args=(self.location,))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 4 * 50)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction_by_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=5)
+        for i in range(10):
+            cache.set(f'key{i}', i)
+        with mock.patch('yatube.cache.time.time',
+                        return_value=time.time() + 10):
+            cache.get('key0')
+            cache.set('key10', 10)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertIsNone(cache.get('key1'))
+        self.assertLessEqual(cache.stats()['entries'], 10)
+
+    def test_eviction_by_size(self):
+        cache = self.make_cache(MAX_SIZE=10000)
+        for i in range(20):
+            cache.set(f'key{i}', 'x' * 1000)
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 10000)
+        self.assertGreater(stats['evictions'], 0)
+
+    def test_stats(self):
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+        self.cache.get('missing')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']),
+                         (1, 1, 1))
+
+
+def _increment(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(50):
+        cache.incr('counter')
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        cls.other = Group.objects.create(title='Другое', slug='other')
+        cls.post = Post.objects.create(text='Запись в сообществе',
+                                       author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_render_posts(self):
+        urls = {
+            reverse('feed'): 'application/rss+xml',
+            reverse('feed_atom'): 'application/atom+xml',
+            reverse('group_feed', args=['test']): 'application/rss+xml',
+            reverse('group_feed_atom', args=['test']): 'application/atom+xml',
+            reverse('profile_feed', args=['Author']): 'application/rss+xml',
+            reverse('profile_feed_atom', args=['Author']):
+                'application/atom+xml',
+        }
+        for url, content_type in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type))
+                self.assertContains(response, 'Запись в сообществе')
+                self.assertContains(response, reverse(
+                    'post', args=['Author', FeedsTest.post.pk]))
+        self.assertNotContains(
+            self.client.get(reverse('group_feed', args=['other'])),
+            'Запись в сообществе')
+
+    def test_repeat_poll_is_served_from_cache(self):
+        url = reverse('group_feed', args=['test'])
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIn('public', first['Cache-Control'])
+
+    def test_new_post_invalidates_only_its_scopes(self):
+        group_url = reverse('group_feed', args=['test'])
+        other_url = reverse('group_feed', args=['other'])
+        etag = self.client.get(group_url)['ETag']
+        self.client.get(other_url)
+        Post.objects.create(text='Свежая запись', author=FeedsTest.author,
+                            group=FeedsTest.group)
+        response = self.client.get(group_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежая запись')
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+
+    def test_unknown_group_is_404(self):
+        response = self.client.get(reverse('group_feed', args=['missing']))
+        self.assertEqual(response.status_code, 404)
@@ -1,11 +1,14 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from PIL import Image
 
 from posts.forms import PostForm, CommentForm
 from posts.models import Group, Post, Comment
@@ -136,3 +139,80 @@ class GroupCreateFormTest(TestCase):
         # self.assertFormError(
         #     response, 'form', 'slug', 'first уже существует'
         # )
+
+
+class ImageUploadTest(TestCase):
+    def make_upload(self, image, image_format, name, **options):
+        buffer = BytesIO()
+        image.save(buffer, image_format, **options)
+        return SimpleUploadedFile(name=name, content=buffer.getvalue(),
+                                  content_type=f'image/{image_format}')
+
+    def clean(self, upload):
+        form = PostForm(data={'text': 'Картинка'}, files={'image': upload})
+        form.is_valid()
+        return form
+
+    def test_large_photo_is_downscaled_rotated_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        exif[0x010F] = 'Phone'  # Make
+        upload = self.make_upload(Image.new('RGB', (4000, 3000), 'red'),
+                                  'JPEG', 'photo.jpeg', exif=exif.tobytes())
+        form = self.clean(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (1920, 2560))
+        self.assertFalse(image.getexif())
+        self.assertTrue(form.cleaned_data['image'].name.endswith('.jpg'))
+
+    def test_transparent_png_stays_png(self):
+        upload = self.make_upload(Image.new('RGBA', (10, 10)), 'PNG',
+                                  'logo.png')
+        form = self.clean(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(Image.open(form.cleaned_data['image']).format, 'PNG')
+
+    def test_small_gif_is_kept_as_is(self):
+        form = self.clean(SimpleUploadedFile(
+            name='small.gif', content=SMALL_GIF, content_type='image/gif'))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['image'].read(), SMALL_GIF)
+
+    def test_pixel_bomb_is_rejected(self):
+        upload = self.make_upload(Image.new('1', (8000, 8000)), 'PNG',
+                                  'bomb.png')
+        with mock.patch('posts.uploads.ImageOps.exif_transpose') as decode:
+            form = self.clean(upload)
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+        decode.assert_not_called()
+
+    def test_truncated_jpeg_is_rejected(self):
+        upload = self.make_upload(Image.effect_noise((300, 200), 64),
+                                  'JPEG', 'broken.jpeg')
+        content = upload.read()
+        form = self.clean(SimpleUploadedFile(
+            name='broken.jpeg', content=content[:len(content) // 2],
+            content_type='image/jpeg'))
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_truncated_jpeg_on_new_post_is_form_error(self):
+        user = get_user_model().objects.create_user(username='uploader')
+        client = Client()
+        client.force_login(user)
+        upload = self.make_upload(Image.effect_noise((300, 200), 64),
+                                  'JPEG', 'broken.jpeg')
+        content = upload.read()
+        response = client.post(reverse('new_post'), {
+            'text': 'Битая картинка',
+            'image': SimpleUploadedFile('broken.jpeg',
+                                        content[:len(content) // 2],
+                                        content_type='image/jpeg'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'form', 'image',
+                             'Не удалось прочитать картинку.')
+        self.assertFalse(Post.objects.filter(author=user).exists())
@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import metrics
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        author = get_user_model().objects.create_user(username='author')
+        Post.objects.create(text='Текст', author=author)
+
+    def test_server_timing_header(self):
+        timing = self.client.get(reverse('index'))['Server-Timing']
+        for name in ('db;', 'tpl;', 'cache;', 'view;', 'total;'):
+            self.assertIn(name, timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_metrics_are_labelled_by_view(self):
+        self.client.get(reverse('profile', args=['author']))
+        self.client.get(reverse('profile', args=['author']))
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertRegex(
+            text, r'yatube_request_duration_seconds_bucket'
+                  r'\{view="profile",le="\+Inf"\} \d+')
+        self.assertRegex(text, r'yatube_cache_hits_total\{view="profile"\}')
+        self.assertRegex(
+            text, r'yatube_requests_total\{status="200",view="profile"\}')
+
+    def test_other_processes_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, '1.json'), 'w') as output:
+                json.dump({
+                    'counters': [['yatube_test_total', [['view', 'x']], 5]],
+                    'histograms': [],
+                }, output)
+            metrics.inc('yatube_test_total', 2, view='x')
+            with override_settings(METRICS_DIR=directory):
+                text = metrics.render()
+                metrics.flush()
+                self.assertTrue(os.path.exists(
+                    os.path.join(directory, f'{os.getpid()}.json')))
+        self.assertIn('yatube_test_total{view="x"} 7', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_closed_for_other_addresses(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
@@ -1,7 +1,10 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
-from posts.models import Post, Group
+from posts.models import AuthorCounters, Comment, Follow, Post, Group
 
 
 class PostModelTest(TestCase):
@@ -52,3 +55,49 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_object_name = 'crush'
         self.assertEquals(post.text, expected_object_name)
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(username='Author')
+        self.reader = get_user_model().objects.create_user(username='Reader')
+        self.post = Post.objects.create(text='crush', author=self.author)
+
+    def counters(self, user):
+        return AuthorCounters.objects.for_user(user)
+
+    def test_comment_count(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Вау')
+        self.assertEqual(self.post.comment_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_posts_and_follow_counters(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        follow.delete()
+        self.post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+
+    def test_recount_repairs_drift(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='a')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.update(comment_count=7)
+        AuthorCounters.objects.all().delete()
+        call_command('recount', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+
+    def test_author_deletion_keeps_counters_consistent(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.delete()
+        self.assertEqual(self.counters(self.reader).following_count, 0)
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+
+from posts.middleware import QueryBudgetExceeded, query_budget
+from posts.models import Comment, Follow, Group, Post
+
+
+@query_budget(0)
+def greedy_view(request):
+    list(Group.objects.all())
+    return HttpResponse()
+
+
+urlpatterns = [
+    path('greedy/', greedy_view),
+]
+
+
+@override_settings(QUERY_BUDGET='raise')
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тест',
+            slug='test',
+            description='Домашние тесты',
+        )
+        cls.author = get_user_model().objects.create_user(username='Author')
+        cls.reader = get_user_model().objects.create_user(username='Reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetTest.reader)
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(text=f'Пост {i}',
+                                       author=QueryBudgetTest.author,
+                                       group=QueryBudgetTest.group)
+            Comment.objects.create(post=post, author=QueryBudgetTest.reader,
+                                   text='Вау')
+        return post
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_listing_queries_do_not_grow_with_page_size(self):
+        urls = [
+            reverse('index'),
+            reverse('group_posts', args=[QueryBudgetTest.group.slug]),
+            reverse('profile', args=[QueryBudgetTest.author.username]),
+            reverse('follow_index'),
+        ]
+        self.create_posts(1)
+        # оба замера с холодным кэшем подписок
+        cache.clear()
+        single = [self.count_queries(self.authorized_client, url)
+                  for url in urls]
+        self.create_posts(9)
+        cache.clear()
+        full = [self.count_queries(self.authorized_client, url)
+                for url in urls]
+        self.assertEqual(single, full)
+
+    def test_post_view_queries_do_not_grow_with_comments(self):
+        post = self.create_posts(1)
+        url = reverse('post', args=[QueryBudgetTest.author.username, post.id])
+        before = self.count_queries(self.authorized_client, url)
+        for i in range(5):
+            Comment.objects.create(post=post, author=QueryBudgetTest.reader,
+                                   text=f'Вау {i}')
+        self.assertEqual(
+            self.count_queries(self.authorized_client, url), before)
+
+    def test_views_stay_within_budget(self):
+        post = self.create_posts(10)
+        for url in (
+            reverse('index'),
+            reverse('group_posts', args=[QueryBudgetTest.group.slug]),
+            reverse('profile', args=[QueryBudgetTest.author.username]),
+            reverse('post', args=[QueryBudgetTest.author.username, post.id]),
+        ):
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                self.authorized_client.get(url)
+        self.authorized_client.get(reverse('follow_index'))
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_exceeded_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.guest_client.get('/greedy/')
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from posts.ratelimit import parse_rate
+
+
+@override_settings(RATE_LIMITS={
+    'post': ('2/h', '5/h'),
+    'comment': ('2/m', '3/m'),
+    'follow': ('2/m', None),
+})
+class RateLimitTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Текст', author=self.author)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def login(self):
+        client = Client()
+        client.force_login(self.user)
+        return client
+
+    def comment(self, client=None):
+        return (client or self.client).post(
+            reverse('add_comment', args=['author', self.post.id]),
+            {'text': 'Комментарий'})
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('5/10m'), (5, 600))
+        with self.assertRaises(ValueError):
+            parse_rate('10 в минуту')
+
+    def test_comments_over_limit_are_rejected_cheaply(self):
+        for _ in range(2):
+            self.assertEqual(self.comment().status_code, 302)
+        # только чтение сессии
+        with self.assertNumQueries(1):
+            response = self.comment()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) >= 1)
+        self.assertEqual(Comment.objects.count(), 2)
+        text = self.client.get('/metrics').content.decode()
+        self.assertRegex(text, r'yatube_ratelimit_rejected_total'
+                               r'\{key="user",scope="comment"\} [1-9]')
+
+    def test_post_view_limits_only_post(self):
+        url = reverse('post', args=['author', self.post.id])
+        for _ in range(2):
+            self.client.post(url, {'text': 'Комментарий'})
+        self.assertEqual(
+            self.client.post(url, {'text': 'Комментарий'}).status_code, 429)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_ip_limit_covers_all_sessions(self):
+        other = Client()
+        other.force_login(self.author)
+        self.comment()
+        self.comment(other)
+        self.comment(other)
+        self.assertEqual(self.comment().status_code, 429)
+
+    def test_new_session_of_same_user_is_still_limited(self):
+        for _ in range(2):
+            self.comment(self.login())
+        self.assertEqual(self.comment(self.login()).status_code, 429)
+
+    def test_follow_is_limited_on_get(self):
+        url = reverse('profile_follow', args=['author'])
+        for _ in range(2):
+            self.client.get(url)
+        self.assertEqual(self.client.get(url).status_code, 429)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_new_post_limit_and_disabled_scope(self):
+        for _ in range(2):
+            self.client.post(reverse('new_post'), {'text': 'Пост'})
+        self.assertEqual(self.client.post(
+            reverse('new_post'), {'text': 'Пост'}).status_code, 429)
+        with override_settings(RATE_LIMITS={}):
+            self.assertEqual(self.client.post(
+                reverse('new_post'), {'text': 'Пост'}).status_code, 302)
@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import path, reverse
+
+from posts import cache
+from posts.models import Group, Post
+from yatube.routers import (STICKY_COOKIE, ReplicaRouter, read_alias,
+                            read_from_replica)
+from yatube.sqlite.base import backup
+
+
+@read_from_replica
+def reading_view(request):
+    return HttpResponse(read_alias() or 'primary')
+
+
+@read_from_replica
+def version_view(request):
+    return HttpResponse(cache.index_version())
+
+
+def writing_view(request):
+    Group.objects.create(title='Новая', slug='new')
+    return HttpResponse(read_alias() or 'primary')
+
+
+urlpatterns = [
+    path('read/', reading_view),
+    path('write/', writing_view),
+    path('version/', version_view),
+]
+
+
+# в тестах реплики нет: роль реплики играет основная база
+@override_settings(ROOT_URLCONF=__name__, REPLICA_DATABASE='default')
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_marked_view_reads_from_replica(self):
+        self.assertEqual(self.client.get('/read/').content, b'default')
+        self.assertEqual(self.client.post('/read/').content, b'primary')
+
+    def test_unmarked_view_reads_from_primary(self):
+        self.assertEqual(self.client.get('/write/').content, b'primary')
+
+    def test_write_makes_reads_sticky_to_primary(self):
+        response = self.client.get('/write/')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.client.get('/read/').content, b'primary')
+
+    def test_reads_do_not_set_cookie(self):
+        response = self.client.get('/read/')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_replica_sync_changes_fragment_versions(self):
+        primary = self.client.post('/version/').content
+        before = self.client.get('/version/').content
+        cache.bump('replica')
+        self.assertNotEqual(self.client.get('/version/').content, before)
+        self.assertEqual(self.client.post('/version/').content, primary)
+
+    @override_settings(REPLICA_DATABASE='missing')
+    def test_unconfigured_replica_falls_back_to_primary(self):
+        self.assertEqual(self.client.get('/read/').content, b'primary')
+
+
+class StickyWritesTest(TestCase):
+    def test_follow_and_comment_set_cookie(self):
+        author = get_user_model().objects.create_user(username='author')
+        reader = get_user_model().objects.create_user(username='reader')
+        post = Post.objects.create(text='Текст', author=author)
+        client = Client()
+        client.force_login(reader)
+        response = client.get(reverse('profile_follow', args=['author']))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        client.cookies.pop(STICKY_COOKIE)
+        response = client.post(
+            reverse('add_comment', args=['author', post.pk]),
+            {'text': 'Комментарий'})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+
+class ReplicaSyncTest(SimpleTestCase):
+    def test_router_writes_and_migrates_only_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+    def test_backup_refreshes_open_replica(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary = os.path.join(directory, 'primary.sqlite3')
+            replica = os.path.join(directory, 'replica.sqlite3')
+            writer = sqlite3.connect(primary)
+            writer.execute('CREATE TABLE item (name TEXT)')
+            writer.commit()
+            backup(primary, replica)
+            reader = sqlite3.connect(replica)
+            self.assertEqual(
+                reader.execute('SELECT COUNT(*) FROM item').fetchone(), (0,))
+            writer.execute("INSERT INTO item VALUES ('one')")
+            writer.commit()
+            backup(primary, replica)
+            self.assertEqual(
+                reader.execute('SELECT COUNT(*) FROM item').fetchone(), (1,))
+            reader.close()
+            writer.close()
@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post
+from posts.paginator import NEXT, encode_cursor
+
+
+class SearchIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='reader')
+        cls.cats = Post.objects.create(text='Коты и кошки', author=cls.user)
+        cls.dogs = Post.objects.create(text='Про собак', author=cls.user)
+        cls.comment = Comment.objects.create(
+            post=cls.dogs, author=cls.user, text='А у меня кот')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def found(self, query, per_page=10, cursor=None):
+        page = search.SearchPaginator(query, per_page).get_page(cursor)
+        return [post.pk for post in page]
+
+    def test_post_text_ranks_above_comment(self):
+        self.assertEqual(self.found('КОТ'), [self.cats.pk, self.dogs.pk])
+
+    def test_index_follows_edit_and_delete(self):
+        self.cats.text = 'Про птиц'
+        self.cats.save()
+        self.comment.delete()
+        self.assertEqual(self.found('кот'), [])
+        self.assertEqual(self.found('птиц'), [self.cats.pk])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.found('собак" OR NEAR('), [])
+        self.assertEqual(self.found('"собак"'), [self.dogs.pk])
+        self.assertEqual(self.found('!!!'), [])
+
+    def test_keyset_pages_cover_all_results(self):
+        for number in range(5):
+            Post.objects.create(text=f'кот номер {number}', author=self.user)
+        paginator = search.SearchPaginator('кот', 3)
+        seen, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            seen += [post.pk for post in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_later_pages_reuse_ranking(self):
+        for number in range(5):
+            Post.objects.create(text=f'кот номер {number}', author=self.user)
+        paginator = search.SearchPaginator('кот', 3)
+        first = paginator.get_page()
+        with CaptureQueriesContext(connection) as queries:
+            second = paginator.get_page(first.next_cursor)
+        self.assertFalse([query for query in queries
+                          if 'MATCH' in query['sql']])
+        self.assertEqual(len(second), 3)
+        Post.objects.create(text='новый кот', author=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            paginator.get_page(second.next_cursor)
+        self.assertTrue([query for query in queries
+                         if 'MATCH' in query['sql']])
+
+    def test_ranking_reads_through_router(self):
+        with mock.patch('posts.search.router.db_for_read',
+                        return_value='default') as db_for_read:
+            self.found('кот')
+        db_for_read.assert_called_with(Post)
+
+    def test_tampered_cursor_returns_first_page(self):
+        cursor = encode_cursor(NEXT, ['лучший', 'первый'])
+        self.assertEqual(self.found('кот', cursor=cursor),
+                         [self.cats.pk, self.dogs.pk])
+
+    def test_rebuild_restores_index(self):
+        Post.objects.filter(pk=self.dogs.pk).update(text='Про лошадей')
+        search.rebuild_index()
+        self.assertEqual(self.found('лошад'), [self.dogs.pk])
+
+    @override_settings(QUERY_BUDGET='raise')
+    def test_search_view_paginates_with_query(self):
+        for number in range(12):
+            Post.objects.create(text=f'кот {number}', author=self.user)
+        response = self.client.get(reverse('search'), {'q': 'кот'})
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertContains(response, 'q=%D0%BA%D0%BE%D1%82&amp;cursor=')
+        response = self.client.get(reverse('search'), {
+            'q': 'кот', 'cursor': response.context['page'].next_cursor})
+        self.assertEqual(len(response.context['page']), 4)
+
+    def test_admin_search_uses_index(self):
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошки'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.cats])
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'кот'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.comment])
@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, FeedEntry, Follow, Post, ThumbnailTask
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedDataTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def seed(self, prefix, *args):
+        call_command('seed_data', '--users', '10', '--groups', '2',
+                     '--posts', '40', '--comments', '60', '--follows', '30',
+                     '--prefix', prefix, *args, stdout=io.StringIO())
+
+    def snapshot(self, prefix):
+        posts = Post.objects.filter(
+            author__username__startswith=prefix).order_by('id')
+        return [
+            (post.text, post.pub_date, post.author.username[len(prefix):],
+             post.image.name, post.comments.count())
+            for post in posts
+        ]
+
+    def test_same_seed_gives_same_data(self):
+        self.seed('a', '--images', '0.5')
+        self.seed('b', '--images', '0.5')
+        self.seed('c', '--seed', '2')
+        self.assertEqual(self.snapshot('a'), self.snapshot('b'))
+        self.assertNotEqual(self.snapshot('a'), self.snapshot('c'))
+        self.assertTrue(ThumbnailTask.objects.exists())
+
+    def test_derived_data_is_built(self):
+        self.seed('a')
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Comment.objects.count(), 60)
+        self.assertEqual(FeedEntry.objects.count(), Post.objects.filter(
+            author__following__isnull=False).count())
+        post = Post.objects.order_by('-comment_count').first()
+        self.assertEqual(post.comment_count, post.comments.count())
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')).exists())
+
+    def test_prefix_must_be_new(self):
+        self.seed('a')
+        with self.assertRaises(CommandError):
+            self.seed('a')
+
+
+class BenchUrlsTest(TestCase):
+    def test_every_route_is_measured(self):
+        call_command('seed_data', '--users', '5', '--groups', '1',
+                     '--posts', '20', '--comments', '10', '--follows', '10',
+                     stdout=io.StringIO())
+        follows = list(Follow.objects.values_list('user', 'author'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            call_command('bench_urls', '--repeat', '1', '--json', path,
+                         stdout=io.StringIO())
+            with open(path, encoding='utf-8') as source:
+                results = json.load(source)['results']
+            call_command('bench_urls', '--repeat', '1', '--compare', path,
+                         stdout=io.StringIO())
+        for name in ('index', 'post', 'signup', 'about:tech'):
+            self.assertEqual(results[f'{name} [anonymous]']['status'], 200)
+        self.assertEqual(results['follow_index [user]']['status'], 200)
+        self.assertTrue(all(row['status'] < 500
+                            for row in results.values()))
+        # GET на follow/unfollow не оставляет следов
+        self.assertEqual(
+            list(Follow.objects.values_list('user', 'author')), follows)
@@ -0,0 +1,71 @@
+import io
+import json
+import logging
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'slow.log')
+        author = get_user_model().objects.create_user(username='author')
+        Post.objects.create(text='Текст', author=author)
+
+    def get(self, url, **overrides):
+        # middleware читает настройки при создании клиента
+        with override_settings(SLOW_QUERY_LOG=self.path, **overrides):
+            return Client().get(url)
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as source:
+            return [json.loads(line) for line in source]
+
+    def test_slow_queries_are_logged_with_plan(self):
+        self.get(reverse('profile', args=['author']), SLOW_QUERY_MS=0)
+        records = self.records()
+        self.assertTrue(records)
+        self.assertEqual({record['view'] for record in records}, {'profile'})
+        select = next(record for record in records
+                      if 'posts_post' in record['sql'])
+        self.assertTrue(select['plan'])
+        self.assertTrue(select['origin'].startswith(('posts', 'yatube')))
+        self.assertIn("'author'", json.dumps(
+            [record['params'] for record in records]))
+
+    def test_fast_and_unsampled_requests_are_not_logged(self):
+        self.get(reverse('profile', args=['author']))
+        self.get(reverse('profile', args=['author']), SLOW_QUERY_MS=0,
+                 SLOW_QUERY_SAMPLE_RATE=0)
+        self.assertEqual(self.records(), [])
+
+    def test_foreign_handlers_are_kept(self):
+        foreign = logging.StreamHandler(io.StringIO())
+        logger = logging.getLogger('yatube.slowlog')
+        logger.addHandler(foreign)
+        self.addCleanup(logger.removeHandler, foreign)
+        response = self.get(reverse('index'), SLOW_QUERY_MS=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(foreign, logger.handlers)
+        self.assertTrue(self.records())
+
+    def test_summary_command(self):
+        self.get(reverse('profile', args=['author']), SLOW_QUERY_MS=0)
+        self.get(reverse('index'), SLOW_QUERY_MS=0)
+        output = io.StringIO()
+        call_command('slow_queries', '--log', self.path, '--view', 'index',
+                     stdout=output)
+        self.assertIn('маршруты: index', output.getvalue())
+        self.assertNotIn('profile', output.getvalue())
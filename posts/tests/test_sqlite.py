@@ -0,0 +1,39 @@
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from yatube.sqlite.base import DEFAULT_PRAGMAS
+
+
+class SQLiteBackendTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connection(self):
+        # NORMAL = 1, MEMORY = 2
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('cache_size'),
+                         DEFAULT_PRAGMAS['cache_size'])
+        self.assertEqual(self.pragma('busy_timeout'), connection.pragmas()[
+            'busy_timeout'])
+
+    def test_settings_override_defaults(self):
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        self.assertNotEqual(connection.pragmas()['busy_timeout'],
+                            DEFAULT_PRAGMAS['busy_timeout'])
+
+
+class ImmediateTransactionTest(TransactionTestCase):
+    # TestCase держит свою транзакцию, и atomic() внутри - лишь SAVEPOINT
+    def test_transaction_takes_write_lock_immediately(self):
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record), transaction.atomic():
+            self.assertTrue(connection.connection.in_transaction)
+        self.assertEqual(statements[0], 'BEGIN IMMEDIATE')
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Blob, Post, Thumbnail, ThumbnailTask
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='Ya')
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            text='Мем', author=self.user,
+            image=SimpleUploadedFile(name=name, content=SMALL_GIF,
+                                     content_type='image/gif'))
+
+    def gc(self):
+        call_command('gc_media', '--grace', '0', stdout=StringIO())
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create_post('meme.gif')
+        second = self.create_post('copy of meme.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertEqual(Blob.objects.get(name=first.image.name).refcount, 2)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory), [
+            os.path.basename(first.image.name)])
+
+    def test_duplicate_reuses_thumbnails(self):
+        self.create_post()
+        call_command('thumbnails', '--workers', '0', stdout=StringIO())
+        self.create_post()
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+    def test_gc_keeps_referenced_and_removes_released_blobs(self):
+        first = self.create_post()
+        second = self.create_post()
+        call_command('thumbnails', '--workers', '0', stdout=StringIO())
+        name = first.image.name
+        thumbnail_names = list(Thumbnail.objects.values_list('name',
+                                                             flat=True))
+        first.delete()
+        self.gc()
+        self.assertTrue(os.path.exists(second.image.path))
+
+        second.delete()
+        self.assertEqual(Blob.objects.get(name=name).refcount, 0)
+        self.gc()
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+        self.assertFalse(os.path.exists(second.image.path))
+        self.assertFalse(Thumbnail.objects.exists())
+        for thumbnail_name in thumbnail_names:
+            self.assertFalse(default_storage.exists(thumbnail_name))
+
+    def test_gc_removes_untracked_files(self):
+        orphan = os.path.join(MEDIA_ROOT, 'posts', 'orphan.gif')
+        os.makedirs(os.path.dirname(orphan), exist_ok=True)
+        with open(orphan, 'wb') as file:
+            file.write(SMALL_GIF)
+        self.gc()
+        self.assertFalse(os.path.exists(orphan))
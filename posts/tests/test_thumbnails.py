@@ -0,0 +1,135 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from posts.models import Post, Thumbnail, ThumbnailTask
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='Ya')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, text='С картинкой'):
+        self.authorized_client.post(reverse('new_post'), data={
+            'text': text,
+            'image': SimpleUploadedFile(name='small.gif', content=SMALL_GIF,
+                                        content_type='image/gif'),
+        })
+        return Post.objects.get(text=text)
+
+    def test_saving_image_enqueues_task(self):
+        post = self.create_post()
+        self.assertTrue(ThumbnailTask.objects.filter(
+            source=post.image.name).exists())
+        self.assertFalse(Thumbnail.objects.exists())
+
+    def test_page_falls_back_to_original_until_ready(self):
+        post = self.create_post()
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, post.image.url)
+
+    def test_worker_builds_thumbnail(self):
+        post = self.create_post()
+        call_command('thumbnails', '--workers', '0', stdout=StringIO())
+        self.assertFalse(ThumbnailTask.objects.exists())
+        thumbnail = Thumbnail.objects.get(source=post.image.name,
+                                          width=960, format='jpeg')
+        self.assertEqual(thumbnail.height, 339)
+        self.assertTrue(default_storage.exists(thumbnail.name))
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_worker_invalidates_cached_pages(self):
+        post = self.create_post()
+        cache.clear()
+        guest_client = Client()
+        urls = [
+            reverse('index'),
+            reverse('profile', args=['Ya']),
+            reverse('post', args=['Ya', post.pk]),
+        ]
+        for url in urls:
+            guest_client.get(url)
+            self.authorized_client.get(url)
+        call_command('thumbnails', '--workers', '0', stdout=StringIO())
+        thumbnail = Thumbnail.objects.get(source=post.image.name,
+                                          width=960, format='jpeg')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(guest_client.get(url), thumbnail.url)
+                self.assertContains(self.authorized_client.get(url),
+                                    thumbnail.url)
+
+    def test_worker_builds_responsive_variants(self):
+        post = self.create_post()
+        call_command('thumbnails', '--workers', '0', stdout=StringIO())
+        variants = Thumbnail.objects.filter(source=post.image.name)
+        self.assertEqual(
+            set(variants.values_list('width', 'format')),
+            {(width, image_format) for width in (480, 768, 960)
+             for image_format in ('jpeg', 'webp')})
+        for variant in variants:
+            with self.subTest(name=variant.name):
+                self.assertEqual(variant.size,
+                                 default_storage.size(variant.name))
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '480w')
+        report = StringIO()
+        call_command('bench_images', stdout=report)
+        self.assertIn('webp', report.getvalue())
+
+    def test_editing_text_does_not_enqueue_again(self):
+        post = self.create_post()
+        call_command('thumbnails', '--workers', '0', stdout=StringIO())
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+    def test_page_thumbnails_are_fetched_in_one_batch(self):
+        for i in range(3):
+            self.create_post(f'Пост {i}')
+        call_command('thumbnails', '--workers', '0', stdout=StringIO())
+        cache.clear()
+
+        def thumbnail_queries(url):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client.get(url)
+            self.assertEqual(
+                response.content.decode().count('<picture>'), 3)
+            return [query for query in queries
+                    if 'posts_thumbnail' in query['sql']]
+
+        self.assertEqual(len(thumbnail_queries(reverse('index'))), 1)
+        self.assertEqual(
+            len(thumbnail_queries(reverse('index') + '?page=1')), 0)
@@ -2,14 +2,18 @@ import shutil
 import tempfile
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase, Client
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django import forms
 from django.urls import reverse
 
-from posts.models import Group, Post, Follow
+from posts.models import Comment, Group, Post, Follow
+from posts.paginator import NEXT, encode_cursor
 
 
 SMALL_GIF = (
@@ -207,3 +211,201 @@ class PaginatorViewsTest(TestCase):
         response = self.authorized_client.get(reverse('index') + '?page=2')
         get_page = response.context.get('page').object_list
         self.assertEquals(len(get_page), 3)
+
+
+class FollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username='Author')
+        cls.other = get_user_model().objects.create_user(username='Other')
+        cls.old_post = Post.objects.create(text='old', author=cls.author)
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='Reader')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_feed(self):
+        response = self.authorized_client.get(reverse('follow_index'))
+        return list(response.context.get('page'))
+
+    def test_follow_backfills_existing_posts(self):
+        self.authorized_client.get(
+            reverse('profile_follow', args=[FollowFeedTest.author]))
+        self.assertEqual(self.get_feed(), [FollowFeedTest.old_post])
+
+    def test_new_post_fans_out_in_time_order(self):
+        self.authorized_client.get(
+            reverse('profile_follow', args=[FollowFeedTest.author]))
+        new_post = Post.objects.create(text='new',
+                                       author=FollowFeedTest.author)
+        Post.objects.create(text='foreign', author=FollowFeedTest.other)
+        self.assertEqual(self.get_feed(), [new_post, FollowFeedTest.old_post])
+
+    def test_unfollow_cleans_feed(self):
+        self.authorized_client.get(
+            reverse('profile_follow', args=[FollowFeedTest.author]))
+        self.authorized_client.get(
+            reverse('profile_unfollow', args=[FollowFeedTest.author]))
+        self.assertEqual(self.get_feed(), [])
+
+
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='Ya')
+        for i in range(13):
+            Post.objects.create(text=f'Ya {i}', author=cls.user)
+
+    def setUp(self):
+        # страницы проверяются по контексту, а не из кэша для анонимов
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        first = self.guest_client.get(reverse('index') + '?cursor=')
+        first_page = first.context.get('page')
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+
+        second = self.guest_client.get(
+            reverse('index') + f'?cursor={first_page.next_cursor}')
+        second_page = second.context.get('page')
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            list(first_page) + list(second_page),
+            list(Post.objects.order_by('-pub_date', '-id')))
+
+        back = self.guest_client.get(
+            reverse('index') + f'?cursor={second_page.previous_cursor}')
+        self.assertEqual(list(back.context.get('page')), list(first_page))
+
+    def test_cursor_page_skips_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('index') + '?cursor=')
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.guest_client.get(reverse('index') + '?cursor=%%%')
+        self.assertEqual(len(response.context.get('page')), 10)
+
+    def test_tampered_cursor_values_fall_back_to_first_page(self):
+        for values in (['вчера', 1], ['2020-01-01T00:00:00', 'один'],
+                       [None, 1], [[], {}]):
+            with self.subTest(values=values):
+                cursor = encode_cursor(NEXT, values)
+                response = self.guest_client.get(
+                    reverse('index'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context.get('page')), 10)
+                self.assertFalse(response.context.get('page').has_previous())
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Текст', author=cls.author)
+        for i in range(7):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_post_page_shows_first_comments_only(self):
+        response = self.guest_client.get(
+            reverse('post', args=['Author', self.post.id]))
+        page = response.context['comments_page']
+        self.assertEqual([item.text for item in page],
+                         ['Комментарий 6', 'Комментарий 5', 'Комментарий 4'])
+        self.assertContains(response, reverse(
+            'post_comments', args=['Author', self.post.id]))
+
+    def test_fragments_walk_all_comments_in_one_query_each(self):
+        url = reverse('post_comments', args=['Author', self.post.id])
+        page = self.guest_client.get(
+            reverse('post', args=['Author', self.post.id])).context[
+            'comments_page']
+        texts = [item.text for item in page]
+        while page.has_next():
+            with self.assertNumQueries(1):
+                response = self.guest_client.get(
+                    url + f'?cursor={page.next_cursor}')
+            self.assertNotContains(response, '<html')
+            page = response.context['comments_page']
+            texts += [item.text for item in page]
+        self.assertEqual(texts, [f'Комментарий {i}'
+                                 for i in reversed(range(7))])
+
+    def test_fragment_of_missing_post_is_404(self):
+        response = self.guest_client.get(
+            reverse('post_comments', args=['Author', self.post.id + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username='Author')
+        cls.reader = get_user_model().objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        cls.post = Post.objects.create(
+            text='Текст', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.urls = [
+            reverse('post', args=['Author', self.post.pk]),
+            reverse('profile', args=['Author']),
+            reverse('group_posts', args=['test']),
+        ]
+
+    def test_matching_etag_returns_304_with_at_most_one_query(self):
+        for client in (self.guest_client, self.authorized_client):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    etag = client.get(url)['ETag']
+                    with self.assertNumQueries(
+                            0 if client is self.guest_client else 1):
+                        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(self.guest_client.get(url)['ETag'],
+                                    self.authorized_client.get(url)['ETag'])
+
+    def test_changes_invalidate_etag(self):
+        etags = [self.guest_client.get(url)['ETag'] for url in self.urls]
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_both_profiles(self):
+        urls = [reverse('profile', args=['Author']),
+                reverse('profile', args=['Reader'])]
+        etags = [self.guest_client.get(url)['ETag'] for url in urls]
+        Follow.objects.create(user=self.reader, author=self.author)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
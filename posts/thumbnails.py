@@ -0,0 +1,194 @@
+"""
+Фоновая подготовка миниатюр картинок постов.
+
+Сохранение поста с новой картинкой ставит её в очередь ThumbnailTask,
+команда `manage.py thumbnails` обрабатывает очередь пулом процессов.
+Шаблоны показывают готовую миниатюру или оригинал и никогда не
+уменьшают картинку во время запроса.
+"""
+import hashlib
+import logging
+import multiprocessing
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from .cache import bump, image_scopes, version_timeout
+from .models import Post, Thumbnail, ThumbnailTask
+
+logger = logging.getLogger(__name__)
+
+CARD_SIZE = (960, 339)
+# ширины вариантов для srcset: телефоны, планшеты, полная карточка
+CARD_WIDTHS = (480, 768, 960)
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+MAX_ATTEMPTS = 3
+FORMATS = {
+    'jpeg': ('JPEG', {'quality': JPEG_QUALITY, 'optimize': True,
+                      'progressive': True}),
+    'webp': ('WEBP', {'quality': WEBP_QUALITY, 'method': 4}),
+}
+
+
+def enqueue(source, force=False):
+    if force or not Thumbnail.objects.filter(source=source).exists():
+        ThumbnailTask.objects.get_or_create(source=source)
+        cache.delete(_cache_key(source))
+
+
+def thumbnail_name(source, size, extension='jpg'):
+    digest = hashlib.sha1(source.encode()).hexdigest()
+    return posixpath.join('thumbs', digest[:2], digest,
+                          '%dx%d.%s' % (size + (extension,)))
+
+
+def card_sizes():
+    width, height = CARD_SIZE
+    return [(w, round(height * w / width)) for w in CARD_WIDTHS]
+
+
+def available_formats():
+    return [name for name in FORMATS
+            if name != 'webp' or features.check('webp')]
+
+
+def render(source):
+    """
+    Строит все варианты миниатюры одной картинки и возвращает их описания.
+
+    Выполняется в дочернем процессе, поэтому работает только с
+    хранилищем файлов и не обращается к базе данных.
+    """
+    with Post.image.field.storage.open(source) as original:
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image)
+        card = ImageOps.fit(image.convert('RGB'), CARD_SIZE, Image.LANCZOS)
+    variants = []
+    for size in card_sizes():
+        resized = card if size == CARD_SIZE else card.resize(
+            size, Image.LANCZOS)
+        for image_format in available_formats():
+            pil_format, options = FORMATS[image_format]
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            name = thumbnail_name(
+                source, size, 'jpg' if image_format == 'jpeg' else 'webp')
+            default_storage.delete(name)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants.append({'name': name, 'width': size[0],
+                             'height': size[1], 'format': image_format,
+                             'size': len(buffer.getvalue())})
+    return variants
+
+
+def process_pending(limit=100, workers=None):
+    """Обрабатывает до limit задач очереди, возвращает число успешных."""
+    tasks = list(ThumbnailTask.objects.filter(
+        attempts__lt=MAX_ATTEMPTS)[:limit])
+    if not tasks:
+        return 0
+    sources = [task.source for task in tasks]
+    if workers == 0:
+        results = map(_safe_render, sources)
+    else:
+        # дочерние процессы не должны унаследовать открытые соединения
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        executor = ProcessPoolExecutor(workers, mp_context=context)
+        with executor:
+            results = list(executor.map(_safe_render, sources))
+    done = []
+    for task, variants in zip(tasks, results):
+        if variants is None:
+            ThumbnailTask.objects.filter(pk=task.pk).update(
+                attempts=task.attempts + 1)
+            continue
+        with transaction.atomic():
+            Thumbnail.objects.filter(source=task.source).delete()
+            Thumbnail.objects.bulk_create(
+                Thumbnail(source=task.source, **variant)
+                for variant in variants)
+            task.delete()
+        cache.delete(_cache_key(task.source))
+        done.append(task.source)
+    if done:
+        # страницы и фрагменты с оригиналами этих картинок устарели
+        scopes = image_scopes(done)
+        if scopes:
+            bump(*scopes)
+    return len(done)
+
+
+def _safe_render(source):
+    try:
+        return render(source)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру %s', source)
+        return None
+
+
+def _cache_key(source):
+    return 'thumbnail:' + hashlib.sha1(source.encode()).hexdigest()
+
+
+def _describe(thumbnails):
+    """Описание картинки для шаблона: запасной src и srcset по форматам."""
+    srcset = {}
+    for thumbnail in sorted(thumbnails, key=lambda item: item.width):
+        srcset.setdefault(thumbnail.format, []).append(
+            f'{thumbnail.url} {thumbnail.width}w')
+    fallback = max((item for item in thumbnails if item.format == 'jpeg'),
+                   key=lambda item: item.width, default=None)
+    if fallback is None:
+        return False
+    return {
+        'url': fallback.url,
+        'width': fallback.width,
+        'height': fallback.height,
+        'srcset': ', '.join(srcset.get('jpeg', [])),
+        'webp_srcset': ', '.join(srcset.get('webp', [])),
+    }
+
+
+def prefetch_thumbnails(posts):
+    """
+    Подставляет постам готовые миниатюры (post.card_thumbnail).
+
+    Описания миниатюр всей страницы читаются одним get_many из кэша,
+    промахи добираются одним запросом к базе и кладутся в кэш.
+    """
+    posts = [post for post in posts if post.image]
+    keys = {_cache_key(post.image.name): post.image.name for post in posts}
+    found = {keys[key]: value for key, value in cache.get_many(
+        list(keys)).items()}
+    missing = set(keys.values()) - set(found)
+    if missing:
+        # False - миниатюры ещё нет (None кэш не отличает от промаха)
+        grouped = {source: [] for source in missing}
+        for thumbnail in Thumbnail.objects.filter(source__in=missing):
+            grouped[thumbnail.source].append(thumbnail)
+        loaded = {source: _describe(thumbnails)
+                  for source, thumbnails in grouped.items()}
+        # delete из воркера миниатюр не дойдёт до кэша другого процесса,
+        # поэтому срок жизни тот же, что у токенов поколений
+        cache.set_many({_cache_key(source): value
+                        for source, value in loaded.items()},
+                       version_timeout())
+        found.update(loaded)
+    for post in posts:
+        post.card_thumbnail = found[post.image.name] or None
+
+
+def card_thumbnail(post):
+    if not post.image:
+        return None
+    if not hasattr(post, 'card_thumbnail'):
+        prefetch_thumbnails([post])
+    return post.card_thumbnail
@@ -0,0 +1,267 @@
+"""
+Потоковые выгрузка и загрузка сообществ, постов, комментариев и подписок.
+
+Строка выгрузки - плоский словарь полей модели; пользователи и
+сообщества в ссылках записаны по username и slug, поэтому файл можно
+загрузить в базу, где у них другие id. JSONL держит все модели в одном
+файле (поле "model"), CSV - одну модель на файл.
+
+Выгрузка читает таблицы кусками через .iterator(), загрузка пишет
+пачками через bulk_create: память не зависит от размера файла.
+bulk_create не шлёт post_save, поэтому счётчики, ленты подписчиков,
+поисковый индекс и учёт файлов картинок пересчитываются после загрузки
+целиком.
+"""
+import csv
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import cache, feed, search
+from .counters import recount_all
+from .models import (Comment, Follow, Group, Post, Thumbnail, ThumbnailTask,
+                     User)
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+
+# модели в порядке зависимостей: имя -> модель и поля выгрузки
+SPECS = {
+    'group': (Group, {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }),
+    'post': (Post, {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    }),
+    'comment': (Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    'follow': (Follow, {
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+MODELS = tuple(SPECS)
+
+
+class TransferError(Exception):
+    pass
+
+
+def rebuild_derived():
+    """
+    То, что при обычном сохранении делают сигналы: после bulk_create
+    счётчики, ленты, поисковый индекс и очередь миниатюр строятся заново.
+    """
+    recount_all()
+    feed.rebuild()
+    search.rebuild_index()
+    images = Post.objects.exclude(image='').exclude(
+        image__isnull=True).exclude(image__in=Thumbnail.objects.values(
+            'source')).values_list('image', flat=True).order_by()
+    ThumbnailTask.objects.bulk_create(
+        (ThumbnailTask(source=name) for name in images.distinct().iterator()),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+    # 'groups' входит в версию каждой ленты и страницы
+    cache.bump('index', 'groups')
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Разрешает bulk_create записать свои даты в поля auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def export_rows(name):
+    """Строки модели по возрастанию pk, кусками по CHUNK_SIZE."""
+    model, fields = SPECS[name]
+    rows = model.objects.order_by('pk').values_list(*fields.values())
+    for values in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            field: value.isoformat() if isinstance(value, datetime) else value
+            for field, value in zip(fields, values)
+        }
+
+
+def write_jsonl(stream, names):
+    written = dict.fromkeys(names, 0)
+    for name in names:
+        for row in export_rows(name):
+            stream.write(json.dumps({'model': name, **row},
+                                    ensure_ascii=False) + '\n')
+            written[name] += 1
+    return written
+
+
+def write_csv(stream, name):
+    writer = csv.DictWriter(stream, fieldnames=list(SPECS[name][1]),
+                            lineterminator='\n')
+    writer.writeheader()
+    written = 0
+    for row in export_rows(name):
+        writer.writerow(row)
+        written += 1
+    return {name: written}
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise TransferError(f'Строка {number}: {exc}')
+        yield row.pop('model', None), row
+
+
+def read_csv(stream, name):
+    for row in csv.DictReader(stream):
+        # в CSV нет null: пустая ячейка значит "нет значения"
+        yield name, {field: value if value != '' else None
+                     for field, value in row.items()}
+
+
+class Importer:
+    """
+    Копит строки пачками и пишет их через bulk_create.
+
+    Пачка пишется, когда набирает BATCH_SIZE строк или когда в потоке
+    начинается другая модель: к моменту записи постов все сообщества
+    и посты из предыдущих строк уже в базе. id пользователей
+    и сообществ по username и slug запоминаются и ищутся одним запросом
+    на пачку; неизвестные пользователи создаются без пароля.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.users = {}
+        self.groups = {}
+        self.created_users = 0
+        self.counts = dict.fromkeys(MODELS, 0)
+        self.name = None
+        self.batch = []
+
+    def load(self, rows):
+        dates = (Post._meta.get_field('pub_date'),
+                 Comment._meta.get_field('created'))
+        with transaction.atomic(), explicit_dates(*dates):
+            for name, row in rows:
+                if name not in SPECS:
+                    raise TransferError(f'Неизвестная модель: {name}')
+                if name != self.name or len(self.batch) >= self.batch_size:
+                    self.flush()
+                    self.name = name
+                self.batch.append(row)
+            self.flush()
+            self.reset_sequences()
+            rebuild_derived()
+        return self.counts
+
+    def flush(self):
+        if not self.batch:
+            return
+        model = SPECS[self.name][0]
+        build = getattr(self, f'build_{self.name}')
+        self.resolve_users(self.batch)
+        if self.name == 'post':
+            self.resolve_groups(self.batch)
+        try:
+            objects = [build(row) for row in self.batch]
+        except (KeyError, TypeError, ValueError) as exc:
+            raise TransferError(f'{self.name}: неполная строка ({exc!r})')
+        model.objects.bulk_create(objects)
+        if self.name == 'group':
+            self.groups.update((row['slug'], int(row['id']))
+                               for row in self.batch)
+        self.counts[self.name] += len(self.batch)
+        self.batch = []
+
+    def resolve_users(self, rows):
+        names = {row[field] for row in rows for field in ('user', 'author')
+                 if row.get(field)} - set(self.users)
+        if not names:
+            return
+        self.users.update(User.objects.filter(
+            username__in=names).values_list('username', 'id'))
+        missing = names - set(self.users)
+        if missing:
+            User.objects.bulk_create(
+                User(username=username, password=make_password(None))
+                for username in sorted(missing))
+            self.users.update(User.objects.filter(
+                username__in=missing).values_list('username', 'id'))
+            self.created_users += len(missing)
+
+    def resolve_groups(self, rows):
+        slugs = {row['group'] for row in rows
+                 if row.get('group')} - set(self.groups)
+        if not slugs:
+            return
+        self.groups.update(Group.objects.filter(
+            slug__in=slugs).values_list('slug', 'id'))
+        missing = slugs - set(self.groups)
+        if missing:
+            raise TransferError(
+                'Нет сообществ: %s' % ', '.join(sorted(missing)))
+
+    @staticmethod
+    def date(value):
+        moment = parse_datetime(value or '')
+        if moment is None:
+            raise TransferError(f'Неверная дата: {value!r}')
+        return moment
+
+    def build_group(self, row):
+        return Group(id=int(row['id']), title=row['title'], slug=row['slug'],
+                     description=row.get('description') or '')
+
+    def build_post(self, row):
+        return Post(id=int(row['id']), text=row['text'],
+                    pub_date=self.date(row['pub_date']),
+                    author_id=self.users[row['author']],
+                    group_id=self.groups[row['group']] if row.get(
+                        'group') else None,
+                    image=row.get('image') or '')
+
+    def build_comment(self, row):
+        return Comment(id=int(row['id']), post_id=int(row['post']),
+                       author_id=self.users[row['author']], text=row['text'],
+                       created=self.date(row['created']))
+
+    def build_follow(self, row):
+        return Follow(user_id=self.users[row['user']],
+                      author_id=self.users[row['author']])
+
+    @staticmethod
+    def reset_sequences():
+        # посты пришли со своими id: следующий созданный пост не должен
+        # получить уже занятый (SQLite возвращает пустой список)
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Group, Post, Comment])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
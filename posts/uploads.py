@@ -0,0 +1,80 @@
+"""
+Нормализация загружаемых картинок постов.
+
+Размеры проверяются по заголовку до декодирования, большие JPEG
+декодируются сразу в уменьшенном масштабе (draft), поэтому память
+ограничена независимо от размера исходника. Результат повёрнут по
+EXIF, очищен от метаданных и пересжат.
+"""
+import os
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+# больше этого - считаем «бомбой» и отклоняем не декодируя
+MAX_PIXELS = 60 * 1000 * 1000
+MAX_FRAMES_PIXELS = 100 * 1000 * 1000
+# длинная сторона сохраняемого оригинала
+MAX_SIDE = 2560
+JPEG_QUALITY = 85
+
+
+def normalize_image(upload):
+    upload.seek(0)
+    # Pillow декодирует лениво: битый файл падает не в open, а в
+    # exif_transpose, thumbnail или save
+    try:
+        return _normalize(upload)
+    except (Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValidationError('Не удалось прочитать картинку.',
+                              code='invalid_image')
+
+
+def _normalize(upload):
+    image = Image.open(upload)
+    width, height = image.size
+    frames = getattr(image, 'n_frames', 1)
+    if width * height > MAX_PIXELS or (
+            width * height * frames > MAX_FRAMES_PIXELS):
+        raise ValidationError(
+            'Картинка слишком большая: %(width)sx%(height)s.',
+            code='image_too_large',
+            params={'width': width, 'height': height})
+
+    if image.format == 'GIF':
+        # GIF без метаданных и, возможно, с анимацией - сохраняем как есть
+        if max(width, height) <= MAX_SIDE:
+            upload.seek(0)
+            return upload
+
+    if image.format == 'JPEG':
+        # декодер JPEG сразу уменьшает в 2, 4 или 8 раз
+        image.draft('RGB', _fit(image.size, MAX_SIDE))
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > MAX_SIDE:
+        image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+
+    buffer = BytesIO()
+    if _has_alpha(image):
+        image.save(buffer, 'PNG', optimize=True)
+        extension, content_type = 'png', 'image/png'
+    else:
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY,
+                                  optimize=True, progressive=True)
+        extension, content_type = 'jpg', 'image/jpeg'
+    stem = os.path.splitext(os.path.basename(upload.name))[0] or 'image'
+    return SimpleUploadedFile(f'{stem}.{extension}', buffer.getvalue(),
+                              content_type)
+
+
+def _fit(size, max_side):
+    width, height = size
+    scale = min(1, max_side / max(width, height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info)
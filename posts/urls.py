@@ -1,19 +1,30 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 
 urlpatterns = [
     path("", views.index, name="index"),
     path("group/<slug:slug>/", views.group_posts, name="group_posts"),
+    path("group/<slug:slug>/feed/", feeds.group_rss, name="group_feed"),
+    path("group/<slug:slug>/feed/atom/",
+         feeds.group_atom, name="group_feed_atom"),
+    path("feed/", feeds.site_rss, name="feed"),
+    path("feed/atom/", feeds.site_atom, name="feed_atom"),
     path("new/", views.new_post, name="new_post"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
     path("<str:username>/follow/",
          views.profile_follow, name="profile_follow"),
     path("<str:username>/unfollow/",
          views.profile_unfollow, name="profile_unfollow"),
     path("<str:username>/", views.profile, name="profile"),
+    path("<str:username>/feed/", feeds.author_rss, name="profile_feed"),
+    path("<str:username>/feed/atom/",
+         feeds.author_atom, name="profile_feed_atom"),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
+    path("<str:username>/<int:post_id>/comments/",
+         views.post_comments, name="post_comments"),
     path("<str:username>/<int:post_id>/comment/",
          views.add_comment, name="add_comment"),
     path("<str:username>/<int:post_id>/edit/",
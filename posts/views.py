@@ -1,59 +1,128 @@
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from django. contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import F
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 
-from .models import Post, Group, User, Follow
+from yatube.routers import read_from_replica
+
+from .models import Comment, Post, Group, User, Follow
+from .cache import (author_version, follow_version, group_version,
+                    index_version, page_etag)
 from .forms import PostForm, CommentForm
-from yatube.settings import TEN_POSTS
+from .middleware import anonymous_page_cache, query_budget
+from .paginator import CURSOR_PARAM, CursorPaginator, paginate
+from .ratelimit import rate_limit
+from .search import SearchPaginator
 
 
+@read_from_replica
+@anonymous_page_cache(index_version)
+@query_budget(4)
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, TEN_POSTS)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    context = {'page': page}
+    posts = Post.objects.select_related('author', 'group')
+    paginator, page = paginate(request, posts)
+    context = {
+        'page': page,
+        'paginator': paginator,
+        'cache_version': index_version(),
+    }
     return render(request, 'index.html', context)
 
 
+# Валидаторы условного GET: считаются по версиям кэша до запросов к базе,
+# совпавший If-None-Match получает 304 без рендеринга страницы
+def group_etag(request, slug):
+    return page_etag(request, group_version(slug))
+
+
+def author_etag(request, username, post_id=None):
+    return page_etag(request, author_version(username))
+
+
+def post_version(username, post_id):
+    return author_version(username)
+
+
+@read_from_replica
+@anonymous_page_cache(group_version)
+@query_budget(5)
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, TEN_POSTS)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    context = {'group': group, 'page': page}
+    posts = group.posts.select_related('author')
+    paginator, page = paginate(request, posts)
+    context = {
+        'group': group,
+        'page': page,
+        'paginator': paginator,
+        'cache_version': group_version(group.slug),
+    }
     return render(request, 'group.html', context)
 
 
+@read_from_replica
+@query_budget(4)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, settings.TEN_POSTS)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    context = {
+        'query': query,
+        'page': page,
+        'paginator': paginator,
+        'cursor_query': urlencode({'q': query}),
+    }
+    return render(request, 'search.html', context)
+
+
+@read_from_replica
+@anonymous_page_cache(author_version)
+@query_budget(6)
+@condition(etag_func=author_etag)
 def profile(request, username):
-    profile = get_object_or_404(User, username=username)
-    profile_posts = profile.posts.all()
-    paginator = Paginator(profile_posts, TEN_POSTS)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    following = profile.following.filter(user__username=request.user)
+    profile = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
+    profile_posts = profile.posts.select_related('group')
+    paginator, page = paginate(request, profile_posts)
+    following = (request.user.is_authenticated and profile.following.filter(
+        user=request.user).exists())
     context = {
         'posts': profile_posts,
         'page': page,
+        'paginator': paginator,
         'profile': profile,
         'following': following,
+        'cache_version': author_version(profile.username),
     }
     return render(request, 'profile.html', context)
 
 
+@rate_limit('comment')
+@read_from_replica
+@anonymous_page_cache(post_version)
+@query_budget(10)
+@condition(etag_func=author_etag)
 def post_view(request, username, post_id):
-    profile = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    following = profile.following.filter(user__username=request.user)
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        author__username=username, id=post_id)
+    profile = post.author
+    following = (request.user.is_authenticated and profile.following.filter(
+        user=request.user).exists())
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+    comments = post.comments.select_related('author')
     context = {
         'post': post,
+        'comments': comments,
+        'comments_page': comments_page(request, comments),
         'form': form,
         'profile': profile,
         'following': following,
@@ -61,6 +130,34 @@ def post_view(request, username, post_id):
     return render(request, 'post.html', context)
 
 
+def comments_page(request, comments):
+    """Страница комментариев, новые сверху, вместе с авторами."""
+    paginator = CursorPaginator(comments, settings.COMMENTS_PER_PAGE,
+                                ('-created', '-id'))
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+
+@read_from_replica
+@anonymous_page_cache(post_version)
+@query_budget(4)
+@condition(etag_func=author_etag)
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев фрагментом HTML для post.html."""
+    comments = Comment.objects.select_related('author').filter(
+        post_id=post_id, post__author__username=username)
+    page = comments_page(request, comments)
+    if not page and not Post.objects.filter(
+            author__username=username, id=post_id).exists():
+        raise Http404
+    context = {
+        'comments_page': page,
+        'username': username,
+        'post_id': post_id,
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+@rate_limit('comment')
 @login_required
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, author__username=username, id=post_id)
@@ -92,6 +189,7 @@ def post_edit(request, username, post_id):
     return render(request, 'new_post.html', context)
 
 
+@rate_limit('post')
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -106,25 +204,24 @@ def new_post(request):
 
 
 # view-функции для подписки
+@read_from_replica
+@query_budget(5)
 @login_required
 def follow_index(request):
-    user = request.user
-    followings = Follow.objects.filter(
-        user=user).select_related('author').all()
-    posts = []
-    if followings:
-        for following in followings:
-            posts += following.author.posts.all()
-    page_number = request.GET.get('page')
-    paginator = Paginator(posts, TEN_POSTS)
-    page = paginator.get_page(page_number)
+    posts = Post.objects.select_related('author', 'group').filter(
+        feed__user=request.user).annotate(
+        feed_pub_date=F('feed__pub_date')).order_by('-feed_pub_date')
+    paginator, page = paginate(
+        request, posts, ordering=('-feed_pub_date', '-id'))
     context = {
         'page': page,
-        'paginator': paginator
+        'paginator': paginator,
+        'cache_version': follow_version(request.user.id),
     }
     return render(request, "follow.html", context)
 
 
+@rate_limit('follow', methods=('GET', 'POST'))
 @login_required
 def profile_follow(request, username):
     user = request.user
@@ -135,6 +232,7 @@ def profile_follow(request, username):
     return redirect('profile', username)
 
 
+@rate_limit('follow', methods=('GET', 'POST'))
 @login_required
 def profile_unfollow(request, username):
     user = request.user
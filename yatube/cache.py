@@ -0,0 +1,306 @@
+"""
+Кэш Django в общем файле SQLite (WAL) для всех процессов на хосте.
+
+В отличие от LocMemCache, записи и сброс поколений видны всем
+воркерам WSGI, а внешний сервер (memcached, Redis) не нужен.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {
+                'MAX_ENTRIES': 50000,
+                'MAX_SIZE': 256 * 1024 * 1024,
+            },
+        },
+    }
+
+Вытеснение: при превышении MAX_ENTRIES или MAX_SIZE (байт) удаляются
+давно не читавшиеся записи (LRU). Целые числа хранятся как INTEGER,
+поэтому incr/decr атомарны для всех процессов.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+CREATE TABLE IF NOT EXISTS cache_stat (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stat (name, value) VALUES
+    ('entries', 0), ('bytes', 0), ('hits', 0), ('misses', 0),
+    ('sets', 0), ('evictions', 0);
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry
+BEGIN
+    UPDATE cache_stat SET value = value + 1 WHERE name = 'entries';
+    UPDATE cache_stat SET value = value + NEW.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_update AFTER UPDATE OF size
+ON cache_entry
+BEGIN
+    UPDATE cache_stat SET value = value + NEW.size - OLD.size
+    WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry
+BEGIN
+    UPDATE cache_stat SET value = value - 1 WHERE name = 'entries';
+    UPDATE cache_stat SET value = value - OLD.size WHERE name = 'bytes';
+END;
+'''
+
+# Обращения к записи чаще раза в секунду не обновляют её метку LRU
+ACCESS_RESOLUTION = 1.0
+# Локальные счётчики попаданий сбрасываются в файл раз в N операций
+STATS_FLUSH_EVERY = 100
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 0)) or None
+        self._busy_timeout = float(options.get('TIMEOUT', 5))
+        self._local = threading.local()
+        self._pending = {'hits': 0, 'misses': 0, 'sets': 0}
+        self._pending_lock = threading.Lock()
+
+    # соединения: отдельное на поток, пересоздаётся после fork()
+    def _connection(self):
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout,
+                isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def _count(self, name, delta=1):
+        with self._pending_lock:
+            self._pending[name] += delta
+            flush = sum(self._pending.values()) >= STATS_FLUSH_EVERY
+        if flush:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, dict.fromkeys(
+                self._pending, 0)
+        self._connection().executemany(
+            'UPDATE cache_stat SET value = value + ? WHERE name = ?',
+            [(value, name) for name, value in pending.items() if value])
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    @staticmethod
+    def _size(key, value):
+        return len(key) + (8 if isinstance(value, int) else len(value))
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        keys_map = {self._key(key, version): key for key in keys}
+        now = time.time()
+        connection = self._connection()
+        placeholders = ', '.join('?' * len(keys_map))
+        rows = connection.execute(
+            'SELECT key, value, accessed FROM cache_entry '
+            'WHERE key IN (%s) AND (expires IS NULL OR expires > ?)'
+            % placeholders, [*keys_map, now]).fetchall()
+        stale = [(now, key) for key, _, accessed in rows
+                 if accessed < now - ACCESS_RESOLUTION]
+        if stale:
+            connection.executemany(
+                'UPDATE cache_entry SET accessed = ? WHERE key = ?', stale)
+        result = {keys_map[key]: self._decode(value)
+                  for key, value, _ in rows}
+        self._count('hits', len(result))
+        self._count('misses', len(keys_map) - len(result))
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = []
+        for key, value in data.items():
+            key = self._key(key, version)
+            value = self._encode(value)
+            rows.append((key, value, expires, now, self._size(key, value)))
+        connection = self._connection()
+        with _immediate(connection):
+            connection.executemany(
+                'INSERT INTO cache_entry '
+                '(key, value, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires, '
+                'accessed = excluded.accessed, size = excluded.size', rows)
+        self._count('sets', len(rows))
+        self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        value = self._encode(value)
+        now = time.time()
+        connection = self._connection()
+        with _immediate(connection):
+            connection.execute(
+                'DELETE FROM cache_entry WHERE key = ? AND expires <= ?',
+                [key, now])
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache_entry '
+                '(key, value, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [key, value, self.get_backend_timeout(timeout), now,
+                 self._size(key, value)]).rowcount == 1
+        if added:
+            self._cull(connection)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'UPDATE cache_entry SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), key, time.time()]
+        ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with _immediate(connection):
+            row = connection.execute(
+                'SELECT value FROM cache_entry '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                [key, time.time()]).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            encoded = self._encode(value)
+            connection.execute(
+                'UPDATE cache_entry SET value = ?, size = ? WHERE key = ?',
+                [encoded, self._size(key, encoded), key])
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._connection().execute(
+                'DELETE FROM cache_entry WHERE key IN (%s)'
+                % ', '.join('?' * len(keys)), keys)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache_entry '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            [key, time.time()]).fetchone() is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entry')
+
+    def close(self, **kwargs):
+        # соединение живёт всё время жизни потока: закрывать его после
+        # каждого запроса дороже, чем держать открытым
+        pass
+
+    def stats(self):
+        """Общая статистика всех процессов, использующих этот файл."""
+        self._flush_stats()
+        return dict(self._connection().execute(
+            'SELECT name, value FROM cache_stat').fetchall())
+
+    def _cull(self, connection):
+        totals = dict(connection.execute(
+            "SELECT name, value FROM cache_stat "
+            "WHERE name IN ('entries', 'bytes')"))
+        entries, size = totals['entries'], totals['bytes']
+        over_entries = entries > self._max_entries
+        over_size = self._max_size is not None and size > self._max_size
+        if not (over_entries or over_size):
+            return
+        with _immediate(connection):
+            evicted = connection.execute(
+                'DELETE FROM cache_entry WHERE expires <= ?',
+                [time.time()]).rowcount
+            if over_entries:
+                # как в LocMemCache: освобождаем 1/cull_frequency записей
+                limit = max(entries - evicted - self._max_entries, 0) + (
+                    self._max_entries // self._cull_frequency)
+                evicted += self._evict(connection, limit)
+            while self._max_size is not None and connection.execute(
+                    "SELECT value FROM cache_stat WHERE name = 'bytes'"
+            ).fetchone()[0] > self._max_size:
+                removed = self._evict(connection, 100)
+                if not removed:
+                    break
+                evicted += removed
+            connection.execute(
+                "UPDATE cache_stat SET value = value + ? "
+                "WHERE name = 'evictions'", [evicted])
+
+    @staticmethod
+    def _evict(connection, limit):
+        return connection.execute(
+            'DELETE FROM cache_entry WHERE key IN ('
+            'SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+            [limit]).rowcount
+
+
+class _immediate:
+    """BEGIN IMMEDIATE ... COMMIT: блокировка записи на время операции."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
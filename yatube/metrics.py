@@ -0,0 +1,332 @@
+"""
+Метрики запросов: заголовок Server-Timing и эндпоинт /metrics.
+
+MetricsMiddleware замеряет для каждого запроса время SQL и число
+запросов, время рендеринга шаблонов, попадания и промахи кэша и общее
+время, отдаёт их браузеру в Server-Timing и копит гистограммы
+и счётчики по имени маршрута (resolver_match.view_name).
+
+Каждый процесс хранит свои метрики в памяти и раз в METRICS_FLUSH_SECONDS
+сбрасывает их в файл <pid>.json в каталоге METRICS_DIR. /metrics
+складывает файлы всех воркеров, поэтому Prometheus видит сайт целиком,
+в какой бы процесс ни попал его запрос. Без METRICS_DIR /metrics
+показывает только свой процесс. Каталог стоит очищать при выкладке:
+иначе счётчики воркеров, которые давно завершились, останутся в сумме
+навсегда.
+"""
+import atexit
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import Template
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# имя -> тип и описание для # HELP
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Ответы по маршруту и коду'),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Полное время обработки запроса'),
+    'yatube_db_duration_seconds': (
+        'histogram', 'Время SQL-запросов за один запрос'),
+    'yatube_db_queries_total': (
+        'counter', 'SQL-запросы'),
+    'yatube_template_duration_seconds': (
+        'histogram', 'Время рендеринга шаблонов за один запрос'),
+    'yatube_cache_hits_total': (
+        'counter', 'Попадания в кэш'),
+    'yatube_cache_misses_total': (
+        'counter', 'Промахи кэша'),
+}
+
+_state = contextvars.ContextVar('metrics_state', default=None)
+_lock = threading.Lock()
+_registry = {'pid': None, 'counters': {}, 'histograms': {}, 'flushed': 0}
+
+
+def _local():
+    # после fork воркер не должен отчитываться цифрами родителя
+    if _registry['pid'] != os.getpid():
+        _registry.update(pid=os.getpid(), counters={}, histograms={},
+                         flushed=time.monotonic())
+    return _registry
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def describe(name, kind, help_text):
+    """Регистрирует метрику, чтобы /metrics вывел для неё TYPE и HELP."""
+    METRICS[name] = (kind, help_text)
+
+
+def inc(name, value=1, **labels):
+    with _lock:
+        counters = _local()['counters']
+        key = (name, _labels(labels))
+        counters[key] = counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    with _lock:
+        histograms = _local()['histograms']
+        key = (name, _labels(labels))
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+        buckets, _ = histogram
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            index = len(BUCKETS)
+        buckets[index] += 1
+        histogram[1] += value
+
+
+def snapshot():
+    with _lock:
+        registry = _local()
+        return {
+            'counters': [[name, labels, value] for (name, labels), value
+                         in registry['counters'].items()],
+            'histograms': [[name, labels, list(buckets), total]
+                           for (name, labels), (buckets, total)
+                           in registry['histograms'].items()],
+        }
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def flush():
+    """Записывает метрики процесса в METRICS_DIR/<pid>.json."""
+    directory = metrics_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+    with os.fdopen(handle, 'w') as output:
+        json.dump(snapshot(), output)
+    # читатели никогда не увидят недописанный файл
+    os.replace(temporary, os.path.join(directory, f'{os.getpid()}.json'))
+    _registry['flushed'] = time.monotonic()
+
+
+def maybe_flush():
+    interval = getattr(settings, 'METRICS_FLUSH_SECONDS', 5)
+    if time.monotonic() - _registry['flushed'] >= interval:
+        flush()
+
+
+def collect():
+    """Метрики всех процессов: файлы других воркеров и память этого."""
+    snapshots = [snapshot()]
+    directory = metrics_dir()
+    if directory and os.path.isdir(directory):
+        own = f'{os.getpid()}.json'
+        for name in os.listdir(directory):
+            if not name.endswith('.json') or name == own:
+                continue
+            try:
+                with open(os.path.join(directory, name)) as source:
+                    snapshots.append(json.load(source))
+            except (OSError, ValueError):
+                # воркер как раз переписывает файл
+                continue
+    counters, histograms = {}, {}
+    for data in snapshots:
+        for name, labels, value in data['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, total in data['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '%s="%s"' % (key, str(value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n'))
+        for key, value in pairs
+    )
+    return '{%s}' % ','.join(escaped)
+
+
+def render():
+    """Текстовый формат Prometheus 0.0.4."""
+    counters, histograms = collect()
+    by_name = {}
+    for (name, labels), value in sorted(counters.items()):
+        by_name.setdefault(name, []).append(
+            f'{name}{_format_labels(labels)} {value}')
+    for (name, labels), (buckets, total) in sorted(histograms.items()):
+        lines = by_name.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), buckets):
+            cumulative += count
+            lines.append('%s_bucket%s %d' % (
+                name, _format_labels(labels, [('le', bound)]), cumulative))
+        lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    output = []
+    for name in sorted(by_name):
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        output.append(f'# HELP {name} {help_text}')
+        output.append(f'# TYPE {name} {kind}')
+        output.extend(by_name[name])
+    return '\n'.join(output) + '\n'
+
+
+def metrics_view(request):
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', None)
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+def _timed_render(render_func):
+    @wraps(render_func)
+    def wrapper(self, *args, **kwargs):
+        state = _state.get()
+        if state is None or state['rendering']:
+            # вложенный render_to_string уже учтён внешним
+            return render_func(self, *args, **kwargs)
+        state['rendering'] = True
+        started = time.perf_counter()
+        try:
+            return render_func(self, *args, **kwargs)
+        finally:
+            state['template'] += time.perf_counter() - started
+            state['rendering'] = False
+    wrapper.metrics_wrapped = True
+    return wrapper
+
+
+def _counted_cache(method, many):
+    @wraps(method)
+    def wrapper(self, keys, *args, **kwargs):
+        state = _state.get()
+        if state is None or state['in_cache']:
+            # get_many по умолчанию зовёт get для каждого ключа
+            return method(self, keys, *args, **kwargs)
+        if many:
+            keys = list(keys)
+        state['in_cache'] = True
+        try:
+            result = method(self, keys, *args, **kwargs)
+        finally:
+            state['in_cache'] = False
+        if many:
+            hits = len(result)
+            misses = len(keys) - hits
+        else:
+            default = args[0] if args else kwargs.get('default')
+            hits = int(result is not default)
+            misses = 1 - hits
+        state['cache_hits'] += hits
+        state['cache_misses'] += misses
+        return result
+    wrapper.metrics_wrapped = True
+    return wrapper
+
+
+def install():
+    """Оборачивает рендеринг шаблонов и чтения из кэшей один раз."""
+    if not getattr(Template.render, 'metrics_wrapped', False):
+        Template.render = _timed_render(Template.render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if not getattr(backend.get, 'metrics_wrapped', False):
+            backend.get = _counted_cache(backend.get, many=False)
+        if not getattr(backend.get_many, 'metrics_wrapped', False):
+            backend.get_many = _counted_cache(backend.get_many, many=True)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        install()
+        atexit.register(flush)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'db': 0.0, 'queries': 0, 'template': 0.0,
+                 'rendering': False, 'cache_hits': 0, 'cache_misses': 0,
+                 'in_cache': False}
+
+        def timed(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                state['db'] += time.perf_counter() - started
+                state['queries'] += 1
+
+        token = _state.set(state)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timed))
+                response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        self.record(match.view_name if match else '', response.status_code,
+                    total, state)
+        response['Server-Timing'] = self.server_timing(total, state)
+        maybe_flush()
+        return response
+
+    @staticmethod
+    def record(view, status, total, state):
+        inc('yatube_requests_total', view=view, status=status)
+        observe('yatube_request_duration_seconds', total, view=view)
+        observe('yatube_db_duration_seconds', state['db'], view=view)
+        observe('yatube_template_duration_seconds', state['template'],
+                view=view)
+        if state['queries']:
+            inc('yatube_db_queries_total', state['queries'], view=view)
+        if state['cache_hits']:
+            inc('yatube_cache_hits_total', state['cache_hits'], view=view)
+        if state['cache_misses']:
+            inc('yatube_cache_misses_total', state['cache_misses'],
+                view=view)
+
+    @staticmethod
+    def server_timing(total, state):
+        # view - время Python-кода без SQL и шаблонов
+        own = max(total - state['db'] - state['template'], 0)
+        return ', '.join((
+            'db;dur=%.1f;desc="%d queries"' % (
+                state['db'] * 1000, state['queries']),
+            'tpl;dur=%.1f' % (state['template'] * 1000),
+            'cache;desc="hit=%d miss=%d"' % (
+                state['cache_hits'], state['cache_misses']),
+            'view;dur=%.1f' % (own * 1000),
+            'total;dur=%.1f' % (total * 1000),
+        ))
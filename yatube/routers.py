@@ -0,0 +1,81 @@
+"""
+Чтение с реплики для помеченных view, запись - всегда в основную базу.
+
+View, помеченные @read_from_replica, на GET и HEAD читают из базы
+settings.REPLICA_DATABASE, если она описана в DATABASES. Любая запись
+в основную базу во время запроса ставит cookie, и следующие
+REPLICA_STICKY_SECONDS секунд этот браузер читает только из основной
+базы: пользователь сразу видит свой пост, комментарий или подписку,
+даже если реплика ещё не догнала основную базу.
+"""
+import contextvars
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'primary_reads'
+
+_state = contextvars.ContextVar('replica_state', default=None)
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+    return alias if alias in connections.databases else None
+
+
+def read_alias():
+    """База для чтения в текущем запросе или None (основная)."""
+    state = _state.get()
+    return state['read'] if state is not None else None
+
+
+def read_from_replica(view_func):
+    """Разрешает view читать с реплики (только GET и HEAD)."""
+    view_func.read_from_replica = True
+    return view_func
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплика - копия основной базы, объекты из них совместимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема попадает на реплику вместе с данными (sync_replica)
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'read': None, 'wrote': False}
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state['wrote']:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 30),
+                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if (state is not None
+                and getattr(view_func, 'read_from_replica', False)
+                and request.method in ('GET', 'HEAD')
+                and STICKY_COOKIE not in request.COOKIES):
+            state['read'] = replica_alias()
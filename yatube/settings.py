@@ -50,20 +50,29 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.slowlog.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'posts.middleware.QueryBudgetMiddleware',
+    'yatube.routers.ReplicaMiddleware',
+    'posts.middleware.PageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# панель отладки только для разработки: с DEBUG = False она не
+# показывается, но всё равно собирала бы данные на каждом запросе
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 
 INTERNAL_IPS = [
     '127.0.0.1'
@@ -99,12 +108,36 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 с WAL и прагмами из OPTIONS, см. yatube/sqlite/base.py
+        'ENGINE': 'yatube.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'busy_timeout': 10000,
+                'mmap_size': 256 * 1024 * 1024,
+            },
+        },
     }
 }
 
 
+# Реплика для чтения: копия основной базы, которую обновляет
+# manage.py sync_replica, YATUBE_REPLICA_PATH=/путь/к/копии.sqlite3
+if os.environ.get('YATUBE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['YATUBE_REPLICA_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+# сколько секунд после записи браузер читает только из основной базы
+REPLICA_STICKY_SECONDS = 30
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -148,6 +181,24 @@ CACHES = {
     }
 }
 
+# Время жизни токенов поколений кэша (posts/cache.py), секунды. Кэш
+# процесса у каждого воркера свой и сброс из другого воркера не увидит:
+# токен живёт не дольше 20 секунд, как прежний {% cache 20 %}.
+CACHE_VERSION_TIMEOUT = 20
+
+# Общий для всех воркеров кэш в файле SQLite: YATUBE_CACHE_PATH=/путь/к/файлу
+if os.environ.get('YATUBE_CACHE_PATH'):
+    CACHES['default'] = {
+        'BACKEND': 'yatube.cache.SQLiteCache',
+        'LOCATION': os.environ['YATUBE_CACHE_PATH'],
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    }
+    # общий кэш: сброс сразу виден всем воркерам, токены бессрочны
+    CACHE_VERSION_TIMEOUT = None
+
 
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'index'
@@ -159,3 +210,41 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 TEN_POSTS = 10
+# комментариев на странице поста и в каждой догружаемой порции
+COMMENTS_PER_PAGE = 20
+
+# Кэш целых страниц для анонимных читателей, 0 - выключен
+PAGE_CACHE_SECONDS = 10 * 60
+
+# Курсорная пагинация лент вместо ?page=N (без COUNT(*) и OFFSET)
+CURSOR_PAGINATION = False
+
+# Бюджеты SQL-запросов view (@query_budget): None, 'log' или 'raise'
+QUERY_BUDGET = 'log' if DEBUG else None
+
+# Ограничение частоты записей (posts/ratelimit.py): область -> лимиты
+# (на пользователя, на IP) вида 'N/период', период s, m, h, d или 10m.
+# None вместо лимита или отсутствие области - без ограничения.
+RATE_LIMITS = {
+    'post': ('20/h', '100/h'),
+    'comment': ('10/m', '50/m'),
+    'follow': ('30/m', '150/m'),
+}
+
+# Метрики запросов (yatube/metrics.py): Server-Timing и /metrics.
+# Общий каталог для файлов метрик воркеров: YATUBE_METRICS_DIR=/путь,
+# без него /metrics показывает только процесс, принявший запрос
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get('YATUBE_METRICS_DIR')
+METRICS_FLUSH_SECONDS = 5
+# адреса, с которых можно читать /metrics, None - с любых
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+# Журнал медленных SQL-запросов (yatube/slowlog.py), включается путём
+# к файлу: YATUBE_SLOW_QUERY_LOG=/путь/slow_queries.log
+SLOW_QUERY_LOG = os.environ.get('YATUBE_SLOW_QUERY_LOG')
+SLOW_QUERY_MS = 100
+# доля запросов к сайту, SQL которых замеряется
+SLOW_QUERY_SAMPLE_RATE = 1.0
+SLOW_QUERY_LOG_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
@@ -0,0 +1,168 @@
+"""
+Журнал медленных SQL-запросов с планами выполнения.
+
+SlowQueryMiddleware оборачивает соединения с базой на время запроса.
+Оборачивается доля запросов SLOW_QUERY_SAMPLE_RATE, остальные работают
+без обёртки и накладных расходов. Каждый SQL-запрос дольше
+SLOW_QUERY_MS записывается строкой JSON в SLOW_QUERY_LOG. В записи есть
+текст и параметры, имя маршрута, место в коде проекта, откуда пришёл
+запрос, и вывод EXPLAIN QUERY PLAN. Файл ротируется по размеру
+(SLOW_QUERY_LOG_BYTES, SLOW_QUERY_LOG_BACKUPS). Сводку по самым
+затратным запросам печатает `manage.py slow_queries`.
+
+Несколько воркеров могут писать в один файл: строки не перемешиваются,
+но ротацию лучше доверить одному процессу или logrotate.
+"""
+import json
+import logging
+import os
+import random
+import time
+import traceback
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+MAX_PARAM_LENGTH = 200
+EXPLAINED = ('SELECT', 'WITH')
+# обёртки execute и бэкенд базы: они есть в стеке любого запроса
+INFRASTRUCTURE = ('yatube/metrics.py', 'yatube/slowlog.py', 'yatube/sqlite/',
+                  'posts/middleware.py')
+
+logger = logging.getLogger(__name__)
+logger.propagate = False
+
+
+def log_files(path):
+    """Текущий файл журнала и его ротированные копии, от новых к старым."""
+    files = [path] + [f'{path}.{number}' for number in range(
+        1, getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 5) + 1)]
+    return [name for name in files if os.path.exists(name)]
+
+
+def _configure(path):
+    path = os.path.abspath(path)
+    # трогаем только свои файловые обработчики: остальные могли добавить
+    # LOGGING или тестовый раннер
+    for handler in list(logger.handlers):
+        if not isinstance(handler, RotatingFileHandler):
+            continue
+        if handler.baseFilename == path:
+            return
+        logger.removeHandler(handler)
+        handler.close()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = RotatingFileHandler(
+        path, encoding='utf-8',
+        maxBytes=getattr(settings, 'SLOW_QUERY_LOG_BYTES', 10 * 1024 * 1024),
+        backupCount=getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 5))
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def origin():
+    """Ближайший к запросу кадр стека из кода проекта."""
+    root = os.path.join(settings.BASE_DIR, '')
+    for frame in reversed(traceback.extract_stack()):
+        if (not frame.filename.startswith(root)
+                or 'site-packages' in frame.filename):
+            continue
+        name = os.path.relpath(frame.filename, root).replace(os.sep, '/')
+        if not name.startswith(INFRASTRUCTURE):
+            return '%s:%d in %s' % (name, frame.lineno, frame.name)
+    return None
+
+
+def explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith(EXPLAINED):
+        return None
+    # свой курсор без execute_wrappers: план не считается запросом
+    # и не сбивает результаты исходного курсора
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(
+            f'{connection.ops.explain_query_prefix()} {sql}', params)
+        rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return [f'EXPLAIN не удался: {exc}']
+    finally:
+        cursor.close()
+    if connection.vendor == 'sqlite':
+        return [row[-1] for row in rows]
+    return [' '.join(map(str, row)) for row in rows]
+
+
+def _short(value):
+    text = repr(value)
+    if len(text) > MAX_PARAM_LENGTH:
+        text = text[:MAX_PARAM_LENGTH] + '...'
+    return text
+
+
+def _params(params):
+    if isinstance(params, (list, tuple)):
+        return [_short(value) for value in params]
+    return _short(params)
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.path = getattr(settings, 'SLOW_QUERY_LOG', None)
+        if not self.path:
+            raise MiddlewareNotUsed
+        _configure(self.path)
+        self.threshold = getattr(settings, 'SLOW_QUERY_MS', 100) / 1000
+        self.sample_rate = getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        request.slow_query_state = state = {'view': ''}
+
+        def timed(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                if elapsed >= self.threshold:
+                    self.record(context['connection'], sql, params, many,
+                                elapsed, state['view'])
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timed))
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = getattr(request, 'slow_query_state', None)
+        if state is not None:
+            state['view'] = request.resolver_match.view_name
+
+    @staticmethod
+    def record(connection, sql, params, many, elapsed, view):
+        if many:
+            # executemany: план один на все строки, в журнал - первые три
+            plan = None
+            params = [_params(row) for row in list(params)[:3]]
+        else:
+            plan = explain(connection, sql, params)
+            params = _params(params)
+        logger.info(json.dumps({
+            'time': timezone.now().isoformat(),
+            'ms': round(elapsed * 1000, 2),
+            'view': view,
+            'db': connection.alias,
+            'sql': sql,
+            'params': params,
+            'many': many,
+            'origin': origin(),
+            'plan': plan,
+            'pid': os.getpid(),
+        }, ensure_ascii=False))
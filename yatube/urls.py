@@ -19,9 +19,13 @@ from django.conf.urls import handler404, handler500
 from . import settings
 from django.conf.urls.static import static
 
+from .metrics import metrics_view
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
     path('', include('posts.urls')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),